@@ -0,0 +1,74 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Database configuration
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME", "healthcare_db")
+
+DATABASE_URL = f"postgres://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Per-process cache of authenticated users (see app/utils/user_cache.py)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+
+# Worker pool for bcrypt hashing/verification (see app/utils/hashing.py)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 256))
+
+# Claims-only ("stateless") authorization for role-gated dependencies.
+# Revocations (disabled users, bumped token versions) are synced from the
+# database at most every REVOCATION_SYNC_SECONDS.
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", 30))
+
+# Rotating refresh tokens issued alongside access tokens
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+
+# Doctor working hours are wall-clock times in this timezone
+CLINIC_TIMEZONE = os.getenv("CLINIC_TIMEZONE", "UTC")
+# How long a worker trusts its cached copy of a doctor's schedule rules
+SCHEDULE_CACHE_TTL_SECONDS = float(os.getenv("SCHEDULE_CACHE_TTL_SECONDS", 300))
+
+# Short-lived slot holds taken during the booking flow
+SLOT_HOLD_TTL_SECONDS = float(os.getenv("SLOT_HOLD_TTL_SECONDS", 300))
+SLOT_HOLD_MAX_PER_USER = int(os.getenv("SLOT_HOLD_MAX_PER_USER", 3))
+
+# Idempotency-Key replay window, and how long a duplicate waits for the
+# first request with the same key before giving up with a 409
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 30))
+
+# Background sweeper closing out past-due appointments (see app/utils/sweeper.py)
+SWEEPER_ENABLED = os.getenv("SWEEPER_ENABLED", "true").lower() in ("1", "true", "yes")
+SWEEPER_INTERVAL_SECONDS = float(os.getenv("SWEEPER_INTERVAL_SECONDS", 60))
+SWEEPER_BATCH_SIZE = int(os.getenv("SWEEPER_BATCH_SIZE", 500))
+# How long after its end an appointment is left for the doctor to close
+SWEEPER_GRACE_MINUTES = int(os.getenv("SWEEPER_GRACE_MINUTES", 60))
+
+# Real-time push connections (see app/routes/events.py)
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 100))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", 25))
+
+# Route each doctor's bookings through a single-writer queue that commits
+# them in batches (see app/utils/booking_serializer.py)
+BOOKING_SERIALIZER_ENABLED = os.getenv("BOOKING_SERIALIZER_ENABLED", "false").lower() in ("1", "true", "yes")
+BOOKING_BATCH_SIZE = int(os.getenv("BOOKING_BATCH_SIZE", 32))
+BOOKING_ACTOR_IDLE_SECONDS = float(os.getenv("BOOKING_ACTOR_IDLE_SECONDS", 30))
+
+# Appointment reminders (see app/utils/reminders.py)
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "true").lower() in ("1", "true", "yes")
+# How long before the start each reminder goes out, comma-separated minutes
+REMINDER_LEAD_MINUTES = [int(m) for m in os.getenv("REMINDER_LEAD_MINUTES", "1440,60").split(",") if m.strip()]
+REMINDER_TICK_SECONDS = float(os.getenv("REMINDER_TICK_SECONDS", 1))
+# Reminders are read from the database this far ahead of when they are due
+REMINDER_LOAD_AHEAD_MINUTES = int(os.getenv("REMINDER_LOAD_AHEAD_MINUTES", 60))
+# After a restart, reminders that fell due this long ago are still sent
+REMINDER_CATCHUP_MINUTES = int(os.getenv("REMINDER_CATCHUP_MINUTES", 30))
+# "log" or "file"; the file notifier appends JSON lines to REMINDER_FILE
+REMINDER_NOTIFIER = os.getenv("REMINDER_NOTIFIER", "log")
+REMINDER_FILE = os.getenv("REMINDER_FILE", "reminders.jsonl")
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Depends
 from tortoise.contrib.fastapi import register_tortoise
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -10,7 +10,27 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import routers
-from app.routes import medical_record, patient, doctor, appointment, auth
+from app.routes import medical_record, patient, doctor, appointment, auth, waitlist, events
+from app.core.config import DATABASE_URL, SWEEPER_ENABLED, REMINDERS_ENABLED
+from app.models.user import User
+from app.utils.auth import get_current_admin
+from app.utils.user_cache import user_cache
+from app.utils.hashing import password_hasher
+from app.utils.revocation import revocation_list
+from app.utils.database import apply_schema_updates
+from app.utils.schedule import schedule_cache, SCHEDULE_CHANNEL, handle_remote_schedule_change
+from app.utils.db_events import db_events
+from app.utils.interval_index import interval_index
+from app.utils.appointment_events import (
+    APPOINTMENT_CHANNEL, APPOINTMENT_PUSH_CHANNEL, handle_remote_changes, handle_remote_push, wait_for_backfills
+)
+from app.utils.event_broker import event_broker
+from app.utils.booking_serializer import booking_serializer
+from app.utils.slot_holds import slot_holds, SLOT_HOLD_CHANNEL
+from app.utils.idempotency import idempotency_store
+from app.utils.sweeper import appointment_sweeper
+from app.utils.waitlist import waitlist_matcher
+from app.utils.reminders import reminder_scheduler
 
 # Create FastAPI app with metadata
 app = FastAPI(
@@ -47,6 +67,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
 )
 
 # Include routers with tags
@@ -55,15 +76,8 @@ app.include_router(patient.router, tags=["Patients"])
 app.include_router(doctor.router, tags=["Doctors"])
 app.include_router(appointment.router, tags=["Appointments"])
 app.include_router(medical_record.router, tags=["Medical Records"])
-
-# Database configuration
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "healthcare_db")
-
-DATABASE_URL = f"postgres://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+app.include_router(waitlist.router, tags=["Waitlist"])
+app.include_router(events.router, tags=["Events"])
 
 # Database setup
 register_tortoise(
@@ -75,13 +89,43 @@ register_tortoise(
             "app.models.patient",
             "app.models.doctor",
             "app.models.appointment",
-            "app.models.medical_record"
+            "app.models.medical_record",
+            "app.models.refresh_token",
+            "app.models.schedule",
+            "app.models.idempotency_key",
+            "app.models.waitlist"
         ]
     },
     generate_schemas=True,
     add_exception_handlers=True,
 )
 
+# Background services lifecycle
+@app.on_event("startup")
+async def start_background_services():
+    await apply_schema_updates()
+    db_events.subscribe(APPOINTMENT_CHANNEL, handle_remote_changes)
+    db_events.subscribe(APPOINTMENT_PUSH_CHANNEL, handle_remote_push)
+    db_events.subscribe(SCHEDULE_CHANNEL, handle_remote_schedule_change)
+    db_events.subscribe(SLOT_HOLD_CHANNEL, slot_holds.apply_remote)
+    # Anything cached before the listener (re)connects may have missed changes
+    db_events.on_reset(interval_index.clear)
+    db_events.on_reset(schedule_cache.clear)
+    await db_events.start()
+    if SWEEPER_ENABLED:
+        appointment_sweeper.start()
+    if REMINDERS_ENABLED:
+        reminder_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await appointment_sweeper.stop()
+    await wait_for_backfills()
+    await reminder_scheduler.stop()
+    await booking_serializer.stop()
+    await db_events.stop()
+    password_hasher.shutdown()
+
 # Custom OpenAPI schema
 def custom_openapi():
     if app.openapi_schema:
@@ -122,7 +166,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
                 "message": exc.detail,
                 "type": "HTTPError"
             }
-        }
+        },
+        headers=exc.headers
     )
 
 @app.exception_handler(Exception)
@@ -153,6 +198,32 @@ async def health_check():
         "database": "connected"
     }
 
+# Metrics endpoint
+@app.get("/metrics", tags=["System"])
+async def metrics(current_user: User = Depends(get_current_admin)):
+    """
+    Expose per-process counters for in-memory caches and background services.
+    Admin only, since they reveal internal state.
+    
+    Returns:
+        dict: Metrics grouped by component
+    """
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "revocation_list": revocation_list.stats(),
+        "schedule_cache": schedule_cache.stats(),
+        "interval_index": interval_index.stats(),
+        "slot_holds": slot_holds.stats(),
+        "idempotency": idempotency_store.stats(),
+        "appointment_sweeper": appointment_sweeper.stats(),
+        "waitlist": waitlist_matcher.stats(),
+        "event_broker": event_broker.stats(),
+        "booking_serializer": booking_serializer.stats(),
+        "reminders": reminder_scheduler.stats(),
+        "db_events": db_events.stats()
+    }
+
 # Root endpoint
 @app.get("/", tags=["System"])
 async def root():
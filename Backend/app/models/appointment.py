@@ -10,8 +10,11 @@ class Appointment(Model):
     status = fields.CharField(
         max_length=20,
         default="scheduled",
-        choices=["scheduled", "completed", "cancelled"]
+        choices=["scheduled", "completed", "cancelled", "no_show"]
     )
+    seat = fields.IntField(default=0)  # Assigned by a trigger, see app/utils/database.py
+    series_id = fields.UUIDField(null=True)  # Shared by appointments booked as one recurring series
+    updated_at = fields.DatetimeField(auto_now=True)  # Also maintained by a trigger, see app/utils/database.py
     
     class Meta:
         table = "appointments"
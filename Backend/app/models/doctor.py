@@ -1,5 +1,6 @@
 from tortoise.models import Model
 from tortoise import fields
+from tortoise.validators import MinValueValidator
 from app.models.user import User
 
 class Doctor(Model):
@@ -13,6 +14,8 @@ class Doctor(Model):
     contact = fields.CharField(max_length=20)
     experience = fields.IntField(default=0)  # Years of experience
     fees = fields.DecimalField(max_digits=10, decimal_places=2, default=0.00)  # Consultation fees
+    # Appointments the doctor can take at once (group sessions, several chairs)
+    capacity = fields.IntField(default=1, validators=[MinValueValidator(1)])
     
     class Meta:
         table = "doctors"
@@ -0,0 +1,25 @@
+from tortoise.models import Model
+from tortoise import fields
+from app.models.user import User
+
+class IdempotencyKey(Model):
+    id = fields.IntField(pk=True)
+    user: fields.ForeignKeyRelation[User] = fields.ForeignKeyField(
+        "models.User",
+        related_name="idempotency_keys",
+        on_delete=fields.CASCADE
+    )
+    key = fields.CharField(max_length=255)  # Client-supplied Idempotency-Key header
+    endpoint = fields.CharField(max_length=64)
+    request_hash = fields.CharField(max_length=64)  # SHA-256 of endpoint and request body
+    status_code = fields.IntField(null=True)  # NULL while the first request is in flight
+    response = fields.JSONField(null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    expires_at = fields.DatetimeField(index=True)
+
+    class Meta:
+        table = "idempotency_keys"
+        unique_together = (("user", "key"),)
+
+    def __str__(self):
+        return f"Idempotency key {self.key} for user {self.user_id}"
@@ -0,0 +1,22 @@
+from tortoise.models import Model
+from tortoise import fields
+from app.models.user import User
+
+class RefreshToken(Model):
+    id = fields.IntField(pk=True)
+    user: fields.ForeignKeyRelation[User] = fields.ForeignKeyField(
+        "models.User",
+        related_name="refresh_tokens",
+        on_delete=fields.CASCADE
+    )
+    token_hash = fields.CharField(max_length=64, unique=True)  # SHA-256 of the opaque token
+    family_id = fields.UUIDField(index=True)  # Shared by every token rotated from one login
+    expires_at = fields.DatetimeField()
+    revoked = fields.BooleanField(default=False)  # Set once rotated or revoked
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "refresh_tokens"
+
+    def __str__(self):
+        return f"Refresh token {self.id} for user {self.user_id}"
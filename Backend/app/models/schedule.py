@@ -0,0 +1,45 @@
+from tortoise.models import Model
+from tortoise import fields
+from app.models.doctor import Doctor
+
+class DoctorSchedule(Model):
+    """Weekly recurring working hours; several rows per weekday model breaks"""
+    id = fields.IntField(pk=True)
+    doctor: fields.ForeignKeyRelation[Doctor] = fields.ForeignKeyField(
+        "models.Doctor",
+        related_name="schedule",
+        on_delete=fields.CASCADE
+    )
+    weekday = fields.IntField()  # 0 = Monday ... 6 = Sunday
+    start_time = fields.TimeField()
+    end_time = fields.TimeField()
+
+    class Meta:
+        table = "doctor_schedules"
+
+    def __str__(self):
+        return f"Doctor {self.doctor_id} weekday {self.weekday}: {self.start_time}-{self.end_time}"
+
+class ScheduleException(Model):
+    """
+    One-off change to a single date. Without times it marks the whole day off
+    (holidays, leave); with times it removes (is_available=False) or adds
+    (is_available=True) that range on top of the weekly hours.
+    """
+    id = fields.IntField(pk=True)
+    doctor: fields.ForeignKeyRelation[Doctor] = fields.ForeignKeyField(
+        "models.Doctor",
+        related_name="schedule_exceptions",
+        on_delete=fields.CASCADE
+    )
+    date = fields.DateField()
+    start_time = fields.TimeField(null=True)
+    end_time = fields.TimeField(null=True)
+    is_available = fields.BooleanField(default=False)
+    reason = fields.CharField(max_length=255, null=True)
+
+    class Meta:
+        table = "schedule_exceptions"
+
+    def __str__(self):
+        return f"Doctor {self.doctor_id} exception on {self.date}"
@@ -17,6 +17,7 @@ class User(Model):
     role = fields.CharEnumField(UserRole, default=UserRole.PATIENT)
     profile_picture = fields.CharField(max_length=500, null=True)
     disabled = fields.BooleanField(default=False)
+    token_version = fields.IntField(default=0)  # Bump to revoke all issued tokens
     
     class Meta:
         table = "users"
@@ -0,0 +1,44 @@
+from tortoise.models import Model
+from tortoise import fields
+from app.models.patient import Patient
+from app.models.doctor import Doctor
+from app.models.appointment import Appointment
+
+class WaitlistEntry(Model):
+    """
+    A patient waiting for an earlier slot, either with one doctor or with any
+    doctor of a specialization (doctor left empty), inside a time window.
+    """
+    id = fields.IntField(pk=True)
+    patient: fields.ForeignKeyRelation[Patient] = fields.ForeignKeyField(
+        "models.Patient",
+        related_name="waitlist_entries",
+        on_delete=fields.CASCADE
+    )
+    doctor: fields.ForeignKeyNullableRelation[Doctor] = fields.ForeignKeyField(
+        "models.Doctor",
+        related_name="waitlist_entries",
+        null=True,
+        on_delete=fields.CASCADE
+    )
+    specialization = fields.CharField(max_length=255, null=True)
+    window_start = fields.DatetimeField()
+    window_end = fields.DatetimeField()
+    status = fields.CharField(
+        max_length=20,
+        default="waiting",
+        choices=["waiting", "booked", "cancelled"]
+    )
+    appointment: fields.ForeignKeyNullableRelation[Appointment] = fields.ForeignKeyField(
+        "models.Appointment",
+        related_name="waitlist_entries",
+        null=True,
+        on_delete=fields.SET_NULL
+    )  # The booking made from this entry
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "waitlist_entries"
+
+    def __str__(self):
+        return f"Waitlist entry {self.id} for patient {self.patient_id}"
@@ -1,37 +1,53 @@
-from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Response, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from tortoise.exceptions import DoesNotExist, IntegrityError
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
 from app.models.appointment import Appointment
 from app.models.patient import Patient
 from app.models.doctor import Doctor
-from app.schemas.appointment import AppointmentOut, AppointmentCreate
-from app.models.user import User
+from app.schemas.appointment import (
+    AppointmentOut, AppointmentCreate, AppointmentReschedule,
+    AppointmentSeriesCreate, AppointmentSeriesOut, SeriesOccurrence, SlotHoldCreate, SlotHoldOut, BulkStatusUpdate, BulkStatusResult, StatusOutcome,
+    AppointmentChange, AppointmentChangeFeed
+)
+from app.models.user import User, UserRole
 from app.utils.auth import get_current_active_user, get_current_doctor
+from app.utils.booking import (
+    ACTIVE_STATUSES, VALID_STATUSES, MIN_APPOINTMENT_DURATION, is_overlap_violation, as_utc,
+    max_concurrency, saturated_intervals
+)
+from app.utils.schedule import schedule_cache
+from app.utils.interval_index import has_conflict
+from app.utils.appointment_events import appointments_changed, snapshot, SNAPSHOT_FIELDS
+from app.utils.idempotency import idempotency_store
+from app.utils.booking_serializer import booking_serializer, BookingRequest
+from app.utils.slot_holds import slot_holds, publish_hold_created, publish_hold_removed
+from app.utils.recurrence import expand_recurrence, MAX_SERIES_OCCURRENCES
+from app.utils.pagination import encode_cursor, after_cursor, after_position, encode_change_cursor, decode_change_cursor
 from pydantic import ValidationError
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
-@router.post("/", response_model=AppointmentOut, status_code=status.HTTP_201_CREATED)
-async def create_appointment(
-    appointment: AppointmentCreate,
-    current_user: User = Depends(get_current_doctor)
-):
-    # Inside the create_appointment function
-    appointment.start_time = datetime.fromisoformat(appointment.start_time)
-    appointment.end_time = datetime.fromisoformat(appointment.end_time)
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = ("id", "patient_id", "doctor_id", "start_time", "end_time", "status")
 
-    
-    """Create a new appointment with conflict checking"""
+async def get_booking_doctor(patient_id: int, doctor_id: int, current_user: User) -> Doctor:
+    """Verify the patient exists and the doctor is the current user"""
     # Verify patient exists
-    patient = await Patient.get_or_none(id=appointment.patient_id)
-    if not patient:
+    if not await Patient.exists(id=patient_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Patient not found"
         )
 
     # Verify doctor exists and matches current user
-    doctor = await Doctor.get_or_none(id=appointment.doctor_id)
+    doctor = await Doctor.get_or_none(id=doctor_id)
     if not doctor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -42,6 +58,32 @@ async def create_appointment(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Can only create appointments for yourself"
         )
+    return doctor
+
+@router.post("/", response_model=AppointmentOut, status_code=status.HTTP_201_CREATED)
+async def create_appointment(
+    appointment: AppointmentCreate,
+    current_user: User = Depends(get_current_doctor),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """Create an appointment; retries carrying the same Idempotency-Key replay the first response"""
+    return await idempotency_store.run(
+        idempotency_key,
+        current_user.id,
+        "appointments.create",
+        appointment,
+        lambda: book_appointment(appointment, current_user),
+        status_code=status.HTTP_201_CREATED
+    )
+
+async def book_appointment(appointment: AppointmentCreate, current_user: User) -> AppointmentOut:
+    # Inside the create_appointment function
+    appointment.start_time = datetime.fromisoformat(appointment.start_time)
+    appointment.end_time = datetime.fromisoformat(appointment.end_time)
+
+    
+    """Create a new appointment with conflict checking"""
+    doctor = await get_booking_doctor(appointment.patient_id, appointment.doctor_id, current_user)
 
     # Validate time range
     if appointment.end_time <= appointment.start_time:
@@ -51,20 +93,29 @@ async def create_appointment(
         )
     
     # Check minimum appointment duration (e.g., 15 minutes)
-    min_duration = timedelta(minutes=15)
+    min_duration = MIN_APPOINTMENT_DURATION
     if (appointment.end_time - appointment.start_time) < min_duration:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Minimum appointment duration is {min_duration.seconds//60} minutes"
         )
 
-    # Check for scheduling conflicts
-    conflicting = await Appointment.filter(
-        doctor_id=appointment.doctor_id,
-        start_time__lt=appointment.end_time,
-        end_time__gt=appointment.start_time,
-        status__not_in=["cancelled", "completed"]
-    ).exists()
+    # Check the doctor's working hours (cached per day)
+    if not await schedule_cache.is_bookable(
+        doctor.id, as_utc(appointment.start_time), as_utc(appointment.end_time)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Outside the doctor's working hours"
+        )
+
+    # Fast-path capacity check against the in-memory interval index, with
+    # slots held by others taking seats too; the exclusion constraint is the
+    # final arbiter for bookings that race past it
+    conflicting = await has_conflict(
+        appointment.doctor_id, appointment.start_time, appointment.end_time,
+        extra=held_intervals(doctor.id, appointment.start_time, appointment.end_time, appointment.hold_id)
+    )
 
     if conflicting:
         raise HTTPException(
@@ -72,21 +123,339 @@ async def create_appointment(
             detail="Time slot already booked"
         )
 
-    # Create appointment
+    # The claim is recorded in the database, so a hold converts into at most one appointment
+    hold = await claim_matching_hold(
+        appointment.hold_id, doctor.id, as_utc(appointment.start_time), as_utc(appointment.end_time),
+        current_user, appointment.patient_id
+    )
+
+    # Create appointment, through the doctor's booking queue if enabled
     try:
-        appointment_obj = await Appointment.create(
-            patient_id=appointment.patient_id,
-            doctor_id=appointment.doctor_id,
-            start_time=appointment.start_time,
-            end_time=appointment.end_time,
-            status=appointment.status
-        )
-        return await AppointmentOut.from_tortoise_orm(appointment_obj)
+        if booking_serializer.enabled:
+            appointment_obj = await booking_serializer.submit(BookingRequest(
+                patient_id=appointment.patient_id,
+                doctor_id=appointment.doctor_id,
+                start_time=appointment.start_time,
+                end_time=appointment.end_time,
+                status=appointment.status,
+                hold_id=hold.id if hold else None
+            ))
+        else:
+            appointment_obj = await Appointment.create(
+                patient_id=appointment.patient_id,
+                doctor_id=appointment.doctor_id,
+                start_time=appointment.start_time,
+                end_time=appointment.end_time,
+                status=appointment.status
+            )
     except IntegrityError as e:
+        if hold:
+            await slot_holds.abandon(hold)
+        if is_overlap_violation(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Time slot already booked"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Database integrity error"
         )
+    except BaseException:
+        if hold:
+            await slot_holds.abandon(hold)
+        raise
+
+    # The booking actor completes holds and propagates its bookings itself
+    if not booking_serializer.enabled:
+        if hold:
+            slot_holds.complete(hold)
+            await publish_hold_removed(hold.id)
+        await appointments_changed([(None, snapshot(appointment_obj))])
+    return await AppointmentOut.from_tortoise_orm(appointment_obj)
+
+def held_intervals(doctor_id: int, start: datetime, end: datetime, exclude_id: Optional[str] = None):
+    """(start, end) of the doctor's holds overlapping the window, which count as bookings"""
+    return [
+        (hold.start_time, hold.end_time)
+        for hold in slot_holds.overlapping(doctor_id, as_utc(start), as_utc(end), exclude_id=exclude_id)
+    ]
+
+async def claim_matching_hold(
+    hold_id: Optional[str], doctor_id: int, start: datetime, end: datetime, current_user: User, patient_id: int
+):
+    """
+    Claim a hold, if given, checking it is for this slot and was taken by
+    the caller or by the user of the patient being booked
+    """
+    if hold_id is None:
+        return None
+    hold = slot_holds.get(hold_id)
+    if hold is not None and hold.owner_id != current_user.id:
+        patient_user_id = await Patient.filter(id=patient_id).first().values_list("user_id", flat=True)
+        if hold.owner_id != patient_user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Slot hold belongs to another user"
+            )
+    hold = await slot_holds.claim(hold_id)
+    if hold is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Slot hold expired or already used"
+        )
+    if hold.doctor_id != doctor_id or hold.start_time != start or hold.end_time != end:
+        await slot_holds.abandon(hold)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Slot hold does not match the requested appointment"
+        )
+    return hold
+
+@router.post("/holds", response_model=SlotHoldOut, status_code=status.HTTP_201_CREATED)
+async def create_slot_hold(
+    request: SlotHoldCreate,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Reserve a slot for a few minutes while the booking form is completed.
+    
+    The hold takes one of the doctor's seats for the interval until it
+    expires, is released, or is converted by passing its `hold_id` to
+    POST /appointments/.
+    """
+    start, end = as_utc(request.start_time), as_utc(request.end_time)
+    if start <= datetime.now(timezone.utc):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Slot holds must start in the future"
+        )
+    if end - start < MIN_APPOINTMENT_DURATION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Minimum appointment duration is {MIN_APPOINTMENT_DURATION.seconds//60} minutes"
+        )
+    if not await Doctor.exists(id=request.doctor_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Doctor not found"
+        )
+    if not await schedule_cache.is_bookable(request.doctor_id, start, end):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Outside the doctor's working hours"
+        )
+    if slot_holds.held_by(current_user.id) >= slot_holds.max_per_user:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"At most {slot_holds.max_per_user} slot holds at a time"
+        )
+    # Reserve first, then count: holds racing for the last seat see each
+    # other and back off, so a seat is never held twice
+    hold = slot_holds.create(request.doctor_id, start, end, owner_id=current_user.id)
+    if await has_conflict(
+        request.doctor_id, start, end, extra=held_intervals(request.doctor_id, start, end, hold.id)
+    ):
+        slot_holds.release(hold)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Time slot already booked"
+        )
+    await publish_hold_created(hold)
+    return SlotHoldOut(
+        hold_id=hold.id,
+        doctor_id=hold.doctor_id,
+        start_time=hold.start_time,
+        end_time=hold.end_time,
+        expires_at=hold.expires_at
+    )
+
+@router.delete("/holds/{hold_id}")
+async def release_slot_hold(
+    hold_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    hold = slot_holds.get(hold_id)
+    if hold is None or hold.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Slot hold not found"
+        )
+    slot_holds.release(hold)
+    await publish_hold_removed(hold.id)
+    return {"message": "Slot hold released"}
+
+@router.post("/series", response_model=AppointmentSeriesOut, status_code=status.HTTP_201_CREATED)
+async def create_appointment_series(
+    series: AppointmentSeriesCreate,
+    current_user: User = Depends(get_current_doctor)
+):
+    """
+    Book a recurring series (daily, weekly or monthly) in one request.
+    
+    All occurrences are checked against existing bookings with a single
+    range query and inserted in one transaction. If any occurrence
+    conflicts the series is rejected with per-occurrence results, unless
+    `skip_conflicts` is set, in which case only the free ones are booked.
+    """
+    doctor = await get_booking_doctor(series.patient_id, series.doctor_id, current_user)
+    start, end = as_utc(series.start_time), as_utc(series.end_time)
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End time must be after start time"
+        )
+    if end - start < MIN_APPOINTMENT_DURATION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Minimum appointment duration is {MIN_APPOINTMENT_DURATION.seconds//60} minutes"
+        )
+
+    # Expand in clinic-local time so a weekly 9:00 stays at 9:00 across DST
+    clinic_tz = schedule_cache.tz
+    occurrences = [
+        SeriesOccurrence(start_time=as_utc(occ_start), end_time=as_utc(occ_end), status="created")
+        for occ_start, occ_end in expand_recurrence(
+            start.astimezone(clinic_tz), end.astimezone(clinic_tz),
+            series.frequency, series.interval, series.count,
+            as_utc(series.until) if series.until else None, limit=MAX_SERIES_OCCURRENCES
+        )
+    ]
+    if not occurrences:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Recurrence rule produces no occurrences"
+        )
+
+    # One range scan covers every occurrence. Appointments and holds are
+    # reduced to the spans where every seat is taken, and a merge-style
+    # sweep over both sorted lists finds the occurrences hitting one
+    span_start, span_end = occurrences[0].start_time, occurrences[-1].end_time
+    busy = await Appointment.filter(
+        doctor_id=doctor.id,
+        start_time__lt=span_end,
+        end_time__gt=span_start,
+        status__in=ACTIVE_STATUSES
+    ).values_list("start_time", "end_time")
+    busy = [(as_utc(busy_start), as_utc(busy_end)) for busy_start, busy_end in busy]
+    full = saturated_intervals(busy + held_intervals(doctor.id, span_start, span_end), doctor.capacity)
+    await schedule_cache.load([doctor.id])
+    i = 0
+    for occurrence in occurrences:
+        while i < len(full) and full[i][1] <= occurrence.start_time:
+            i += 1
+        if i < len(full) and full[i][0] < occurrence.end_time:
+            occurrence.status = "conflict"
+            continue
+        working = schedule_cache.cached_working_intervals(doctor.id, occurrence.start_time, occurrence.end_time)
+        if working is not None and (occurrence.start_time, occurrence.end_time) not in working:
+            occurrence.status = "outside_working_hours"
+
+    bookable = [occurrence for occurrence in occurrences if occurrence.status == "created"]
+    if len(bookable) < len(occurrences) and not series.skip_conflicts:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=[occurrence.model_dump(mode="json") for occurrence in occurrences]
+        )
+    if not bookable:
+        return AppointmentSeriesOut(created=0, occurrences=occurrences)
+
+    series_id = uuid.uuid4()
+    try:
+        async with in_transaction():
+            await Appointment.bulk_create([
+                Appointment(
+                    patient_id=series.patient_id,
+                    doctor_id=doctor.id,
+                    start_time=occurrence.start_time,
+                    end_time=occurrence.end_time,
+                    status="scheduled",
+                    series_id=series_id
+                )
+                for occurrence in bookable
+            ])
+    except IntegrityError as e:
+        if is_overlap_violation(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Time slot already booked"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Database integrity error"
+        )
+
+    # bulk_create doesn't return primary keys; read them back by series
+    created = await Appointment.filter(series_id=series_id).values(*SNAPSHOT_FIELDS)
+    ids_by_start = {as_utc(row["start_time"]): row["id"] for row in created}
+    for occurrence in bookable:
+        occurrence.appointment_id = ids_by_start.get(occurrence.start_time)
+    await appointments_changed([(None, snapshot(row)) for row in created])
+
+    return AppointmentSeriesOut(series_id=series_id, created=len(created), occurrences=occurrences)
+
+@router.patch("/status", response_model=BulkStatusResult)
+async def bulk_update_status(
+    request: BulkStatusUpdate,
+    current_user: User = Depends(get_current_doctor)
+):
+    """
+    Move many of the doctor's appointments to one status, e.g. to close out a day.
+    
+    Ownership is checked with a single IN query and the change is applied
+    with a single UPDATE; every requested ID gets its own outcome.
+    """
+    if request.status not in VALID_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid status. Must be one of: {VALID_STATUSES}"
+        )
+    appointment_ids = list(dict.fromkeys(request.appointment_ids))
+
+    rows = await Appointment.filter(id__in=appointment_ids).values(*SNAPSHOT_FIELDS, "doctor__user_id")
+    found = {row["id"]: row for row in rows}
+    outcomes = {}
+    changing = []
+    for appointment_id in appointment_ids:
+        row = found.get(appointment_id)
+        if row is None:
+            outcomes[appointment_id] = "not_found"
+        elif row["doctor__user_id"] != current_user.id:
+            outcomes[appointment_id] = "forbidden"
+        elif row["status"] == request.status:
+            outcomes[appointment_id] = "unchanged"
+        else:
+            changing.append(snapshot(row))
+
+    changed = []
+    try:
+        if changing:
+            await Appointment.filter(id__in=[row["id"] for row in changing]).update(status=request.status)
+        changed = changing
+    except IntegrityError as e:
+        if not is_overlap_violation(e):
+            raise
+        # Reactivating some of them would double-book the doctor; the
+        # statement was rolled back, so apply the rows one by one instead
+        for row in changing:
+            try:
+                await Appointment.filter(id=row["id"]).update(status=request.status)
+                changed.append(row)
+            except IntegrityError as e:
+                if not is_overlap_violation(e):
+                    raise
+                outcomes[row["id"]] = "conflict"
+    for row in changed:
+        outcomes[row["id"]] = "updated"
+
+    await appointments_changed([(row, {**row, "status": request.status}) for row in changed])
+    return BulkStatusResult(
+        status=request.status,
+        updated=len(changed),
+        results=[
+            StatusOutcome(appointment_id=appointment_id, outcome=outcomes[appointment_id])
+            for appointment_id in appointment_ids
+        ]
+    )
 
 @router.patch("/{appointment_id}/status", status_code=status.HTTP_200_OK)
 async def update_status(
@@ -94,44 +463,292 @@ async def update_status(
     new_status: str = Body(..., embed=True),
     current_user: User = Depends(get_current_doctor)
 ):
-    """Update appointment status (scheduled/completed/cancelled)"""
-    valid_statuses = ["scheduled", "completed", "cancelled"]
+    """Update appointment status (scheduled/completed/cancelled/no_show)"""
+    valid_statuses = VALID_STATUSES
     if new_status not in valid_statuses:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid status. Must be one of: {valid_statuses}"
         )
     
-    appointment = await Appointment.get_or_none(id=appointment_id)
+    appointment = await Appointment.get_or_none(id=appointment_id).select_related("doctor")
     if not appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Appointment not found"
         )
-    
-    print(f"Doctor ID from appointment: {appointment.doctor_id}")  # Debugging log
-    print(f"Current user ID: {current_user.id}")  # Debugging log
-    
-    if appointment.doctor_id != current_user.id:
+
+    if appointment.doctor.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only modify appointments you created"
         )
 
-    await Appointment.filter(id=appointment_id).update(status=new_status)
+    try:
+        await Appointment.filter(id=appointment_id).update(status=new_status)
+    except IntegrityError as e:
+        if is_overlap_violation(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Time slot already booked"
+            )
+        raise
+    before = snapshot(appointment)
+    await appointments_changed([(before, {**before, "status": new_status})])
     return {"message": f"Status updated to {new_status}"}
-    # Update the appointment status
-    await Appointment.filter(id=appointment_id).update(status=new_status)
 
-    return {"message": f"Status updated to {new_status}"}
 
+@router.post("/{appointment_id}/reschedule", response_model=AppointmentOut)
+async def reschedule_appointment(
+    appointment_id: int,
+    request: AppointmentReschedule,
+    current_user: User = Depends(get_current_doctor)
+):
+    """
+    Move an appointment to a new interval in one step.
+    
+    The old slot stays booked until the move commits, so it cannot be lost
+    in between. The capacity check ignores the appointment itself, and the
+    transaction locks only the appointment and the doctor's appointments
+    overlapping the new interval. The freed interval is then offered to
+    the waitlist like a cancellation.
+    """
+    start, end = as_utc(request.start_time), as_utc(request.end_time)
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End time must be after start time"
+        )
+    if end - start < MIN_APPOINTMENT_DURATION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Minimum appointment duration is {MIN_APPOINTMENT_DURATION.seconds//60} minutes"
+        )
+
+    appointment = await Appointment.get_or_none(id=appointment_id).select_related("doctor")
+    if not appointment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Appointment not found"
+        )
+    if appointment.doctor.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only modify appointments you created"
+        )
+    if appointment.status not in ACTIVE_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot reschedule a {appointment.status} appointment"
+        )
+    if not await schedule_cache.is_bookable(appointment.doctor_id, start, end):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Outside the doctor's working hours"
+        )
+    if await has_conflict(
+        appointment.doctor_id, start, end,
+        exclude_id=appointment.id, extra=held_intervals(appointment.doctor_id, start, end, request.hold_id)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Time slot already booked"
+        )
+    hold = await claim_matching_hold(
+        request.hold_id, appointment.doctor_id, start, end, current_user, appointment.patient_id
+    )
+
+    try:
+        async with in_transaction() as connection:
+            locked = await Appointment.filter(
+                id=appointment.id, status__in=ACTIVE_STATUSES
+            ).select_for_update().using_db(connection).first()
+            if locked is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Appointment was changed concurrently"
+                )
+            clashing = await Appointment.filter(
+                doctor_id=appointment.doctor_id,
+                status__in=ACTIVE_STATUSES,
+                start_time__lt=end,
+                end_time__gt=start
+            ).exclude(id=appointment.id).select_for_update().using_db(connection).values_list(
+                "start_time", "end_time"
+            )
+            clashing = [(as_utc(clash_start), as_utc(clash_end)) for clash_start, clash_end in clashing]
+            if max_concurrency(clashing, start, end) >= appointment.doctor.capacity:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Time slot already booked"
+                )
+            before = snapshot(locked)
+            locked.start_time, locked.end_time = start, end
+            await locked.save(using_db=connection, update_fields=["start_time", "end_time", "updated_at"])
+    except IntegrityError as e:
+        if hold:
+            await slot_holds.abandon(hold)
+        if is_overlap_violation(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Time slot already booked"
+            )
+        raise
+    except BaseException:
+        if hold:
+            await slot_holds.abandon(hold)
+        raise
+
+    if hold:
+        slot_holds.complete(hold)
+        await publish_hold_removed(hold.id)
+    await appointments_changed([(before, snapshot(locked))])
+    return await AppointmentOut.from_tortoise_orm(locked)
+
+
+def appointment_filters(
+    doctor_id: Optional[int] = None,
+    patient_id: Optional[int] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None
+) -> dict:
+    """Query-string filters shared by the list and export endpoints"""
+    filters = {}
+    if doctor_id is not None:
+        filters["doctor_id"] = doctor_id
+    if patient_id is not None:
+        filters["patient_id"] = patient_id
+    if status_filter is not None:
+        filters["status"] = status_filter
+    if start_from is not None:
+        filters["start_time__gte"] = start_from
+    if start_to is not None:
+        filters["start_time__lt"] = start_to
+    return filters
+
+def scoped_appointments(current_user: User, filters: dict):
+    """Appointments visible to the user, with role scoping done in SQL"""
+    queryset = Appointment.filter(**filters)
+    if current_user.role == UserRole.PATIENT:
+        queryset = queryset.filter(patient__user_id=current_user.id)
+    elif current_user.role == UserRole.DOCTOR:
+        queryset = queryset.filter(doctor__user_id=current_user.id)
+    return queryset
 
 @router.get("/", response_model=list[AppointmentOut])
 async def get_all_appointments(
+    response: Response,
+    filters: dict = Depends(appointment_filters),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    List appointments visible to the current user, ordered by start time.
+    
+    Results are keyset-paginated: when more rows exist the response carries an
+    `X-Next-Cursor` header to pass back as `cursor` for the next page.
+    """
+    queryset = scoped_appointments(current_user, filters)
+    if cursor:
+        queryset = queryset.filter(after_cursor("start_time", cursor))
+    page = await AppointmentOut.from_queryset(
+        queryset.order_by("start_time", "id").limit(limit + 1)
+    )
+    if len(page) > limit:
+        page = page[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(page[-1].start_time, page[-1].id)
+    return page
+
+@router.get("/export")
+async def export_appointments(
+    filters: dict = Depends(appointment_filters),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get all appointments"""
-    return await AppointmentOut.from_queryset(Appointment.all())
+    """
+    Stream every matching appointment as newline-delimited JSON.
+    
+    Rows are read in keyset batches and written as they arrive, so memory use
+    stays flat no matter how many appointments match.
+    """
+    queryset = scoped_appointments(current_user, filters).order_by("start_time", "id")
+
+    async def rows():
+        batch = await queryset.limit(EXPORT_BATCH_SIZE).values(*EXPORT_FIELDS)
+        while batch:
+            for row in batch:
+                yield json.dumps(jsonable_encoder(row)) + "\n"
+            if len(batch) < EXPORT_BATCH_SIZE:
+                break
+            last = batch[-1]
+            batch = await queryset.filter(
+                after_position("start_time", last["start_time"], last["id"])
+            ).limit(EXPORT_BATCH_SIZE).values(*EXPORT_FIELDS)
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+# Changes in (transaction ID, sequence) order after the cursor, up to the
+# oldest transaction still running: every transaction below that horizon
+# has ended, so nothing can later appear before the last row returned
+CHANGE_FEED_SQL = """
+SELECT * FROM (
+    (SELECT id, FALSE AS deleted, doctor_id, patient_id, start_time, end_time, status, series_id,
+            updated_at, change_xid, change_seq
+     FROM appointments
+     WHERE (change_xid, change_seq) > ($1::xid8, $2) AND change_xid < pg_snapshot_xmin(pg_current_snapshot()) {scope}
+     ORDER BY change_xid, change_seq LIMIT $3)
+    UNION ALL
+    (SELECT appointment_id, TRUE, doctor_id, patient_id, NULL::timestamptz, NULL::timestamptz, NULL::varchar, NULL::uuid,
+            deleted_at, change_xid, change_seq
+     FROM appointment_tombstones
+     WHERE (change_xid, change_seq) > ($1::xid8, $2) AND change_xid < pg_snapshot_xmin(pg_current_snapshot()) {scope}
+     ORDER BY change_xid, change_seq LIMIT $3)
+) AS changes
+ORDER BY change_xid, change_seq
+LIMIT $3
+"""
+
+@router.get("/changes", response_model=AppointmentChangeFeed)
+async def get_appointment_changes(
+    since: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Appointments created, modified or deleted since `since`, oldest change first.
+    
+    Start without `since` to receive every visible appointment once, then
+    keep passing back `next_cursor`: each call returns only the rows that
+    changed in between (a row changed several times appears once, in its
+    latest state), plus tombstones for deleted rows. Cancellations arrive as
+    ordinary changes with status "cancelled". Changes are returned only once
+    every transaction that started before them has ended, so a slow commit
+    is never skipped; a long-running transaction delays the feed instead.
+    """
+    xid, sequence = decode_change_cursor(since) if since else (0, 0)
+
+    # Role scoping by the user's own doctor/patient IDs, so tombstones of rows
+    # that can no longer be joined are scoped the same way
+    params = [xid, sequence, limit + 1]
+    scope = ""
+    if current_user.role in (UserRole.PATIENT, UserRole.DOCTOR):
+        model, column = (Patient, "patient_id") if current_user.role == UserRole.PATIENT else (Doctor, "doctor_id")
+        params.append(await model.filter(user_id=current_user.id).values_list("id", flat=True))
+        scope = f"AND {column} = ANY($4)"
+
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        CHANGE_FEED_SQL.format(scope=scope), params
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return AppointmentChangeFeed(
+        changes=[AppointmentChange(**row) for row in rows],
+        next_cursor=encode_change_cursor(
+            *((rows[-1]["change_xid"], rows[-1]["change_seq"]) if rows else (xid, sequence))
+        ),
+        has_more=has_more
+    )
 
 @router.get("/{appointment_id}", response_model=AppointmentOut)
 async def get_appointment(
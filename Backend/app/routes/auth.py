@@ -1,20 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
-from datetime import timedelta
 from pydantic import ValidationError
 from app.models.user import User
 from app.schemas.auth import (
-    Token, UserCreate, UserOut, LoginForm, UserRole, UserInDB
+    Token, UserCreate, UserOut, LoginForm, UserRole, UserInDB, RefreshRequest
 )
 from app.utils.auth import (
     authenticate_user,
-    create_access_token,
+    create_user_access_token,
     get_password_hash,
     verify_password,
     get_current_user,
     get_current_admin,
-    ACCESS_TOKEN_EXPIRE_MINUTES
+    revoke_user_tokens
 )
+from app.utils.refresh_tokens import issue_refresh_token, rotate_refresh_token
 from tortoise.exceptions import IntegrityError
 from typing import List
 
@@ -26,16 +26,9 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect credentials")
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={
-            "user_id": user.id,
-            "sub": user.username,
-            "role": user.role.value  # Include role in token
-        },
-        expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = create_user_access_token(user)
+    refresh_token = await issue_refresh_token(user)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 @router.post("/login", response_model=Token,
     responses={
@@ -45,7 +38,8 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
                 "application/json": {
                     "example": {
                         "access_token": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9...",
-                        "token_type": "bearer"
+                        "token_type": "bearer",
+                        "refresh_token": "Jm3x0p9b2VqZkN5L1lUaWh4c0FvS2dRc1p3..."
                     }
                 }
             }
@@ -77,7 +71,8 @@ async def login_with_role(form_data: LoginForm = Body(..., example={
     - **password**: User's password
     - **role**: User's role (Admin, Doctor, or Patient)
     
-    Returns a JWT token for authenticated requests.
+    Returns a JWT token for authenticated requests and a refresh token
+    for renewing it through /auth/refresh.
     """
     user = await authenticate_user(form_data.email, form_data.password, form_data.role)
     if not user:
@@ -87,13 +82,50 @@ async def login_with_role(form_data: LoginForm = Body(..., example={
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"user_id": user.id, "role": user.role},
-        expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user)
+    refresh_token = await issue_refresh_token(user)
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/refresh", response_model=Token,
+    responses={
+        401: {
+            "description": "Refresh token invalid, expired or reused",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "error": {
+                            "code": 401,
+                            "message": "Invalid refresh token",
+                            "type": "HTTPError"
+                        }
+                    }
+                }
+            }
+        }
+    })
+async def refresh_access_token(request: RefreshRequest):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+    
+    - **refresh_token**: Refresh token from the last login or refresh
+    
+    Each refresh token is single-use. Reusing one revokes every token
+    rotated from the same login.
+    """
+    user, refresh_token = await rotate_refresh_token(request.refresh_token)
+    access_token = create_user_access_token(user)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_everywhere(current_user: User = Depends(get_current_user)):
+    """
+    Sign the caller out of every session.
+    
+    Every access token issued so far stops working, including the one used
+    for this request, and every outstanding refresh token is revoked.
+    """
+    await revoke_user_tokens(current_user)
 
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED,
     responses={
@@ -156,7 +188,7 @@ async def register_user(user_data: UserCreate = Body(..., example={
         user = await User.create(
             username=user_data.username,
             email=user_data.email,
-            password_hash=get_password_hash(user_data.password),
+            password_hash=await get_password_hash(user_data.password),
             role=user_data.role,
             profile_picture=user_data.profile_picture
         )
@@ -1,14 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Literal, Optional
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from tortoise import Tortoise
 from tortoise.exceptions import DoesNotExist
+from tortoise.transactions import in_transaction
 from app.models.doctor import Doctor
-from app.schemas.doctor import DoctorIn, DoctorOut, DoctorCreate
-from app.models.user import User
+from app.models.appointment import Appointment
+from app.models.schedule import DoctorSchedule, ScheduleException
+from app.schemas.doctor import (
+    DoctorIn, DoctorOut, DoctorCreate, DoctorAvailability, TimeSlot, DoctorSlot, AvailabilitySearchResult,
+    DoctorAssignment, DoctorDayView, DayViewAppointment, DayViewPatient
+)
+from app.schemas.schedule import WeeklyHours, ScheduleExceptionCreate, ScheduleExceptionOut, DoctorScheduleOut
+from app.models.user import User, UserRole
 from app.utils.auth import get_current_doctor, get_current_admin, get_current_active_user
+from app.utils.booking import (
+    ACTIVE_STATUSES, BOOKING_LOCK_NAMESPACE, MIN_APPOINTMENT_DURATION, as_utc, free_windows, complement,
+    merge_intervals, saturated_intervals
+)
+from app.utils.appointment_events import capacity_changed
+from app.utils.schedule import schedule_cache, schedule_changed
+from app.core.config import CLINIC_TIMEZONE
+from app.utils.slot_holds import slot_holds
+from app.utils.slot_bitmap import SlotGrid, occupancy, earliest_runs, from_epoch_micros, to_datetime64
+from app.utils.doctor_load import booked_minutes, week_start
 import logging
 
 router = APIRouter(prefix="/doctors", tags=["doctors"])
 logger = logging.getLogger(__name__)
 
+AVAILABILITY_MAX_WINDOW = timedelta(days=62)
+SEARCH_MAX_WINDOW = timedelta(days=90)
+SLOT_RESOLUTION = MIN_APPOINTMENT_DURATION
+
 # ADMIN-ONLY ENDPOINTS
 @router.post("/", response_model=DoctorOut)
 async def create_doctor(
@@ -62,6 +88,232 @@ async def get_all_doctors(
     return await DoctorOut.from_queryset(Doctor.all())
 
 
+def check_search_window(window_start: datetime, window_end: datetime, duration: int):
+    if window_end <= window_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' must be after 'from'"
+        )
+    if window_end - window_start > SEARCH_MAX_WINDOW:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Search window cannot exceed {SEARCH_MAX_WINDOW.days} days"
+        )
+    if duration < MIN_APPOINTMENT_DURATION.seconds // 60:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Minimum appointment duration is {MIN_APPOINTMENT_DURATION.seconds//60} minutes"
+        )
+
+# Active bookings of many doctors as parallel arrays, times in epoch
+# microseconds, so the bitmap is built without a Python object per booking
+BOOKED_ARRAYS_SQL = """
+SELECT COALESCE(array_agg(doctor_id), '{}') AS doctor_ids,
+       COALESCE(array_agg((EXTRACT(EPOCH FROM start_time) * 1000000)::bigint), '{}') AS starts,
+       COALESCE(array_agg((EXTRACT(EPOCH FROM end_time) * 1000000)::bigint), '{}') AS ends
+FROM appointments
+WHERE doctor_id = ANY($1) AND start_time < $3 AND end_time > $2 AND status = ANY($4)
+"""
+
+async def free_slot_grid(doctors, window_start: datetime, window_end: datetime):
+    """
+    (grid, free) for (doctor_id, capacity) rows: free[row, slot] is True
+    while the doctor has a seat left in that slot of the grid.
+    """
+    doctor_ids = [doctor_id for doctor_id, _ in doctors]
+    booked = (await Tortoise.get_connection("default").execute_query_dict(
+        BOOKED_ARRAYS_SQL, [doctor_ids, window_start, window_end, ACTIVE_STATUSES]
+    ))[0]
+    ids = np.array(doctor_ids, dtype=np.int64)
+    order = np.argsort(ids)
+    booked_rows = order[np.searchsorted(ids, np.array(booked["doctor_ids"], dtype=np.int64), sorter=order)]
+
+    # Slot holds take a seat each; time outside working hours takes them all
+    rows, starts, ends, weights = [], [], [], []
+    await schedule_cache.load(doctor_ids)
+    for row, (doctor_id, capacity) in enumerate(doctors):
+        for hold in slot_holds.overlapping(doctor_id, window_start, window_end):
+            rows.append(row)
+            starts.append(hold.start_time)
+            ends.append(hold.end_time)
+            weights.append(1)
+        working = schedule_cache.cached_working_intervals(doctor_id, window_start, window_end)
+        if working is not None:
+            for start, end in complement(working, window_start, window_end):
+                rows.append(row)
+                starts.append(start)
+                ends.append(end)
+                weights.append(capacity)
+
+    grid = SlotGrid(window_start, window_end, SLOT_RESOLUTION)
+    occupied = occupancy(
+        grid,
+        np.concatenate([booked_rows, np.array(rows, dtype=np.int64)]),
+        np.concatenate([from_epoch_micros(booked["starts"]), to_datetime64(starts)]),
+        np.concatenate([from_epoch_micros(booked["ends"]), to_datetime64(ends)]),
+        len(doctor_ids),
+        np.concatenate([np.ones(len(booked_rows), dtype=np.int32), np.array(weights, dtype=np.int32)])
+    )
+    capacities = np.array([capacity for _, capacity in doctors], dtype=np.int32)
+    return grid, occupied < capacities[:, None]
+
+
+@router.get("/availability/search", response_model=AvailabilitySearchResult)
+async def search_availability(
+    specialization: str,
+    window_start: datetime = Query(..., alias="from"),
+    window_end: datetime = Query(..., alias="to"),
+    duration: int = Query(MIN_APPOINTMENT_DURATION.seconds // 60, description="Slot length in minutes"),
+    mode: Literal["any", "all"] = "any",
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Earliest free slot across every doctor with the given specialization.
+    
+    - **mode=any**: earliest slot per doctor, sorted by start time
+    - **mode=all**: earliest slot where every matching doctor is free
+    
+    Each doctor's window is a row of a fixed-resolution occupancy bitmap
+    built from one batched appointment query, so all doctors are searched
+    at once with vectorized operations. A slot is free while its booking
+    count is below the doctor's capacity.
+    """
+    window_start, window_end = as_utc(window_start), as_utc(window_end)
+    check_search_window(window_start, window_end, duration)
+
+    doctors = await Doctor.filter(specialization__iexact=specialization).order_by("id").values_list("id", "capacity")
+    doctor_ids = [doctor_id for doctor_id, _ in doctors]
+    result = AvailabilitySearchResult(
+        specialization=specialization, mode=mode, duration_minutes=duration, slots=[]
+    )
+    if not doctor_ids:
+        return result
+
+    grid, free = await free_slot_grid(doctors, window_start, window_end)
+    length = -(-duration * 60 // int(SLOT_RESOLUTION.total_seconds()))  # Slots needed, rounded up
+
+    if mode == "all":
+        first = earliest_runs(free.all(axis=0, keepdims=True), length)[0]
+        if first >= 0:
+            start = grid.slot_time(int(first))
+            result.slots = [
+                DoctorSlot(doctor_id=doctor_id, start=start, end=start + timedelta(minutes=duration))
+                for doctor_id in doctor_ids
+            ]
+        return result
+
+    firsts = earliest_runs(free, length)
+    for row in np.argsort(np.where(firsts >= 0, firsts, grid.size), kind="stable"):
+        if firsts[row] < 0:
+            break
+        start = grid.slot_time(int(firsts[row]))
+        result.slots.append(
+            DoctorSlot(doctor_id=doctor_ids[row], start=start, end=start + timedelta(minutes=duration))
+        )
+    return result
+
+@router.get("/assignment", response_model=DoctorAssignment)
+async def assign_doctor(
+    specialization: str,
+    window_start: datetime = Query(..., alias="from"),
+    window_end: datetime = Query(..., alias="to"),
+    duration: int = Query(MIN_APPOINTMENT_DURATION.seconds // 60, description="Slot length in minutes"),
+    max_fees: Optional[Decimal] = Query(None, ge=0, description="Only doctors charging at most this much"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Pick the least-loaded doctor of a specialization with a free slot in the window.
+    
+    Candidates are ranked by minutes already booked in the week of their
+    earliest free slot, then by how soon that slot is, then by fees. Weekly
+    load comes from counters the database keeps up to date on every
+    appointment write, so nothing is aggregated per request. Nothing is
+    booked; pass the returned slot to POST /appointments/holds or
+    POST /appointments/ to take it.
+    """
+    window_start, window_end = as_utc(window_start), as_utc(window_end)
+    check_search_window(window_start, window_end, duration)
+
+    queryset = Doctor.filter(specialization__iexact=specialization)
+    if max_fees is not None:
+        queryset = queryset.filter(fees__lte=max_fees)
+    doctors = await queryset.order_by("id").values_list("id", "capacity", "fees")
+    if not doctors:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No doctor matches the specialization and fees"
+        )
+
+    grid, free = await free_slot_grid(
+        [(doctor_id, capacity) for doctor_id, capacity, _ in doctors], window_start, window_end
+    )
+    length = -(-duration * 60 // int(SLOT_RESOLUTION.total_seconds()))  # Slots needed, rounded up
+    firsts = earliest_runs(free, length)
+    candidates = [
+        (doctor_id, grid.slot_time(int(first)), fees)
+        for (doctor_id, _, fees), first in zip(doctors, firsts)
+        if first >= 0
+    ]
+    if not candidates:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="No doctor has a free slot in the window"
+        )
+
+    load = await booked_minutes((doctor_id, week_start(start)) for doctor_id, start, _ in candidates)
+    doctor_id, start, fees = min(
+        candidates,
+        key=lambda candidate: (load[(candidate[0], week_start(candidate[1]))], candidate[1], candidate[2], candidate[0])
+    )
+    return DoctorAssignment(
+        doctor_id=doctor_id,
+        start=start,
+        end=start + timedelta(minutes=duration),
+        booked_minutes=load[(doctor_id, week_start(start))],
+        fees=fees,
+        candidates=len(candidates)
+    )
+
+@router.get("/me/day", response_model=DoctorDayView)
+async def get_my_day(
+    day: Optional[date] = Query(None, alias="date", description="Clinic-local date, defaults to today"),
+    current_user: User = Depends(get_current_doctor)
+):
+    """
+    The doctor's appointments for one day with patient details and records.
+    
+    Two queries however many appointments there are: one for the
+    appointments joined to their patient and user rows (select_related),
+    and one for the medical records of all of them (prefetch_related).
+    """
+    if day is None:
+        day = datetime.now(schedule_cache.tz).date()
+    day_start = datetime.combine(day, time.min, tzinfo=schedule_cache.tz)
+    day_end = day_start + timedelta(days=1)
+
+    appointments = await Appointment.filter(
+        doctor__user_id=current_user.id,
+        start_time__gte=day_start,
+        start_time__lt=day_end
+    ).select_related("patient__user").prefetch_related("medical_record").order_by("start_time", "id")
+
+    return DoctorDayView(
+        date=day,
+        timezone=CLINIC_TIMEZONE,
+        appointments=[
+            DayViewAppointment(
+                id=appointment.id,
+                start_time=appointment.start_time,
+                end_time=appointment.end_time,
+                status=appointment.status,
+                patient=DayViewPatient.model_validate(appointment.patient, from_attributes=True),
+                medical_record_ids=[record.id for record in appointment.medical_record],
+                has_medical_record=bool(appointment.medical_record)
+            )
+            for appointment in appointments
+        ]
+    )
+
 @router.get("/{doctor_id}", response_model=DoctorOut)
 async def get_doctor(
     doctor_id: int,
@@ -85,6 +337,150 @@ async def get_doctor(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Doctor not found"
         )
+@router.get("/{doctor_id}/availability", response_model=DoctorAvailability)
+async def get_doctor_availability(
+    doctor_id: int,
+    window_start: datetime = Query(..., alias="from"),
+    window_end: datetime = Query(..., alias="to"),
+    duration: int = Query(MIN_APPOINTMENT_DURATION.seconds // 60, description="Minimum slot length in minutes"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Free time windows of at least `duration` minutes between `from` and `to`.
+    
+    Busy intervals are the spans where the doctor's active appointments
+    (one range scan) and live slot holds fill every seat, plus the time
+    outside their working hours (both in-memory lookups), and the gaps are
+    found in a single linear sweep.
+    """
+    window_start, window_end = as_utc(window_start), as_utc(window_end)
+    min_length = timedelta(minutes=duration)
+    if window_end <= window_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' must be after 'from'"
+        )
+    if window_end - window_start > AVAILABILITY_MAX_WINDOW:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Availability window cannot exceed {AVAILABILITY_MAX_WINDOW.days} days"
+        )
+    if min_length < MIN_APPOINTMENT_DURATION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Minimum appointment duration is {MIN_APPOINTMENT_DURATION.seconds//60} minutes"
+        )
+    doctor = await Doctor.get_or_none(id=doctor_id)
+    if not doctor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Doctor not found"
+        )
+
+    busy = await Appointment.filter(
+        doctor_id=doctor_id,
+        start_time__lt=window_end,
+        end_time__gt=window_start,
+        status__in=ACTIVE_STATUSES
+    ).values_list("start_time", "end_time")
+    busy = [(as_utc(start), as_utc(end)) for start, end in busy]
+    busy += [(hold.start_time, hold.end_time) for hold in slot_holds.overlapping(doctor_id, window_start, window_end)]
+    busy = saturated_intervals(busy, doctor.capacity)
+    working = await schedule_cache.working_intervals(doctor_id, window_start, window_end)
+    if working is not None:
+        busy = merge_intervals(busy + complement(working, window_start, window_end))
+
+    return DoctorAvailability(
+        doctor_id=doctor_id,
+        window_start=window_start,
+        window_end=window_end,
+        duration_minutes=duration,
+        slots=[
+            TimeSlot(start=start, end=end)
+            for start, end in free_windows(busy, window_start, window_end, min_length)
+        ]
+    )
+
+# SCHEDULE TEMPLATES
+async def get_managed_doctor(doctor_id: int, current_user: User) -> Doctor:
+    """Doctor whose schedule the user may edit: their own, or any for admins"""
+    doctor = await Doctor.get_or_none(id=doctor_id)
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    if current_user.role != UserRole.ADMIN and doctor.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Can only manage your own schedule"
+        )
+    return doctor
+
+@router.get("/{doctor_id}/schedule", response_model=DoctorScheduleOut)
+async def get_doctor_schedule(
+    doctor_id: int,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Weekly working hours and upcoming exceptions of a doctor"""
+    if not await Doctor.exists(id=doctor_id):
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    weekly = await DoctorSchedule.filter(doctor_id=doctor_id).order_by("weekday", "start_time")
+    exceptions = await ScheduleException.filter(
+        doctor_id=doctor_id, date__gte=date.today()
+    ).order_by("date", "start_time")
+    return DoctorScheduleOut(
+        doctor_id=doctor_id,
+        timezone=CLINIC_TIMEZONE,
+        weekly=[WeeklyHours.model_validate(row) for row in weekly],
+        exceptions=[ScheduleExceptionOut.model_validate(row) for row in exceptions]
+    )
+
+@router.put("/{doctor_id}/schedule", response_model=list[WeeklyHours])
+async def set_weekly_hours(
+    doctor_id: int,
+    hours: list[WeeklyHours],
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Replace the doctor's weekly working hours.
+    
+    Several ranges on one weekday describe breaks (e.g. 09:00-12:00 and
+    13:00-17:00). Sending an empty list removes the template, which lifts
+    all working-hour restrictions.
+    """
+    doctor = await get_managed_doctor(doctor_id, current_user)
+    async with in_transaction():
+        await DoctorSchedule.filter(doctor_id=doctor.id).delete()
+        await DoctorSchedule.bulk_create([
+            DoctorSchedule(doctor_id=doctor.id, **row.model_dump()) for row in hours
+        ])
+    await schedule_changed(doctor.id)
+    return sorted(hours, key=lambda row: (row.weekday, row.start_time))
+
+@router.post("/{doctor_id}/schedule/exceptions", response_model=ScheduleExceptionOut,
+             status_code=status.HTTP_201_CREATED)
+async def add_schedule_exception(
+    doctor_id: int,
+    exception: ScheduleExceptionCreate,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Add a day off, a blocked range or extra working hours on one date"""
+    doctor = await get_managed_doctor(doctor_id, current_user)
+    exception_obj = await ScheduleException.create(doctor_id=doctor.id, **exception.model_dump())
+    await schedule_changed(doctor.id)
+    return ScheduleExceptionOut.model_validate(exception_obj)
+
+@router.delete("/{doctor_id}/schedule/exceptions/{exception_id}")
+async def delete_schedule_exception(
+    doctor_id: int,
+    exception_id: int,
+    current_user: User = Depends(get_current_active_user)
+):
+    doctor = await get_managed_doctor(doctor_id, current_user)
+    deleted_count = await ScheduleException.filter(id=exception_id, doctor_id=doctor.id).delete()
+    if not deleted_count:
+        raise HTTPException(status_code=404, detail="Schedule exception not found")
+    await schedule_changed(doctor.id)
+    return {"message": "Schedule exception deleted"}
+
 @router.put("/{doctor_id}", response_model=DoctorOut)
 async def update_doctor(
     doctor_id: int,
@@ -103,6 +499,32 @@ async def update_doctor(
             detail="Can only update your own profile"
         )
     
-    # Perform update
-    await Doctor.filter(id=doctor_id).update(**doctor_data.dict(exclude_unset=True))
+    updates = doctor_data.dict(exclude_unset=True)
+    if updates.get("capacity", 1) < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Capacity must be at least 1"
+        )
+
+    # Perform update. Lowering capacity takes the doctor's booking lock, as
+    # the seat trigger does, so no booking lands on a removed seat meanwhile
+    async with in_transaction() as connection:
+        if updates.get("capacity", doctor.capacity) < doctor.capacity:
+            await connection.execute_query(
+                "SELECT pg_advisory_xact_lock($1, $2)", [BOOKING_LOCK_NAMESPACE, doctor_id]
+            )
+            stranded = await Appointment.filter(
+                doctor_id=doctor_id,
+                status__in=ACTIVE_STATUSES,
+                seat__gte=updates["capacity"],
+                end_time__gt=datetime.now(timezone.utc)
+            ).using_db(connection).count()
+            if stranded:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"{stranded} upcoming appointments need more than {updates['capacity']} seats"
+                )
+        await Doctor.filter(id=doctor_id).using_db(connection).update(**updates)
+    if "capacity" in updates and updates["capacity"] != doctor.capacity:
+        await capacity_changed(doctor_id)
     return await DoctorOut.from_tortoise_orm(await Doctor.get(id=doctor_id))
\ No newline at end of file
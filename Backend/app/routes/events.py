@@ -0,0 +1,96 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User, UserRole
+from app.utils.auth import decode_token_claims, credentials_exception
+from app.utils.user_cache import user_cache
+from app.utils.event_broker import event_broker, Subscription
+from app.core.config import EVENT_HEARTBEAT_SECONDS
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+async def get_stream_user(token: str) -> User:
+    """
+    Authenticate a push connection. Browsers cannot set headers on WebSocket
+    or EventSource requests, so the access token comes in the query string.
+    """
+    token_data = decode_token_claims(token)
+    user = await user_cache.get_user(token_data.user_id)
+    if user is None or user.disabled or token_data.token_version < user.token_version:
+        raise credentials_exception
+    return user
+
+async def get_user_topics(user: User) -> list[str]:
+    """Doctors follow their own appointments, patients theirs, admins everything"""
+    if user.role == UserRole.ADMIN:
+        return ["all"]
+    if user.role == UserRole.DOCTOR:
+        doctor_ids = await Doctor.filter(user_id=user.id).values_list("id", flat=True)
+        return [f"doctor:{doctor_id}" for doctor_id in doctor_ids]
+    patient_ids = await Patient.filter(user_id=user.id).values_list("id", flat=True)
+    return [f"patient:{patient_id}" for patient_id in patient_ids]
+
+async def next_events(subscription: Subscription):
+    """
+    Yield (type, JSON data) pairs as they are published, and a ("ping", ...)
+    after EVENT_HEARTBEAT_SECONDS of silence so dead connections get noticed.
+    A client that fell behind gets a final "resync" event telling it to
+    catch up from GET /appointments/changes.
+    """
+    while not subscription.overflowed:
+        try:
+            yield await asyncio.wait_for(subscription.queue.get(), EVENT_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            yield "ping", "null"
+    yield "resync", "null"
+
+@router.websocket("/ws")
+async def appointment_event_socket(websocket: WebSocket, token: str = Query(...)):
+    """Push appointment created/status/cancelled events as {"type", "data"} messages"""
+    try:
+        user = await get_stream_user(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    topics = await get_user_topics(user)
+    await websocket.accept()
+
+    subscription = event_broker.subscribe(topics)
+    try:
+        async for kind, data in next_events(subscription):
+            # Data is already serialised; wrap it without decoding it again
+            await websocket.send_text(f'{{"type": {json.dumps(kind)}, "data": {data}}}')
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # Client went away
+    finally:
+        event_broker.unsubscribe(subscription)
+
+@router.get("/stream")
+async def appointment_event_stream(request: Request, token: str = Query(...)):
+    """The same events as /events/ws, as Server-Sent Events"""
+    user = await get_stream_user(token)
+    topics = await get_user_topics(user)
+
+    async def stream():
+        subscription = event_broker.subscribe(topics)
+        try:
+            yield "retry: 5000\n\n"
+            async for kind, data in next_events(subscription):
+                if kind == "ping":
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                else:
+                    yield f"event: {kind}\ndata: {data}\n\n"
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
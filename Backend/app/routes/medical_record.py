@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Header
 from tortoise.exceptions import DoesNotExist
 from app.models.medical_record import MedicalRecord
 from app.models.patient import Patient
@@ -6,6 +7,7 @@ from app.models.appointment import Appointment
 from app.schemas.medical_record import MedicalRecordOut, MedicalRecordCreate
 from app.models.user import User
 from app.utils.auth import get_current_active_user, get_current_doctor
+from app.utils.idempotency import idempotency_store
 import logging
 
 router = APIRouter(prefix="/medical-records", tags=["medical_records"])
@@ -15,8 +17,19 @@ logger = logging.getLogger(__name__)
 @router.post("/", response_model=MedicalRecordOut)
 async def create_medical_record(
     record: MedicalRecordCreate,
-    current_user: User = Depends(get_current_doctor)  # Only doctors can create
+    current_user: User = Depends(get_current_doctor),  # Only doctors can create
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
+    """Create a medical record; retries carrying the same Idempotency-Key replay the first response"""
+    return await idempotency_store.run(
+        idempotency_key,
+        current_user.id,
+        "medical_records.create",
+        record,
+        lambda: write_medical_record(record, current_user)
+    )
+
+async def write_medical_record(record: MedicalRecordCreate, current_user: User) -> MedicalRecordOut:
     # Verify patient exists
     patient = await Patient.get_or_none(id=record.patient_id)
     if not patient:
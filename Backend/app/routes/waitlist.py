@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.models.waitlist import WaitlistEntry
+from app.models.patient import Patient
+from app.models.doctor import Doctor
+from app.schemas.waitlist import WaitlistEntryCreate, WaitlistEntryOut
+from app.models.user import User, UserRole
+from app.utils.auth import get_current_active_user
+from app.utils.booking import as_utc
+
+router = APIRouter(prefix="/waitlist", tags=["waitlist"])
+
+@router.post("/", response_model=WaitlistEntryOut, status_code=status.HTTP_201_CREATED)
+async def join_waitlist(
+    entry: WaitlistEntryCreate,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Wait for a slot inside [window_start, window_end) with one doctor or any
+    doctor of a specialization.
+
+    When a matching appointment is cancelled the slot is booked for the
+    longest-waiting entry automatically, so there is no need to poll for
+    availability.
+    """
+    patient = await Patient.get_or_none(id=entry.patient_id)
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found"
+        )
+    if current_user.role == UserRole.PATIENT and patient.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Patients can only join the waitlist for themselves"
+        )
+    if entry.doctor_id is not None and not await Doctor.exists(id=entry.doctor_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Doctor not found"
+        )
+    if as_utc(entry.window_end) <= datetime.now(timezone.utc):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="window_end must be in the future"
+        )
+
+    entry_obj = await WaitlistEntry.create(**entry.model_dump())
+    return WaitlistEntryOut.model_validate(entry_obj)
+
+@router.get("/", response_model=list[WaitlistEntryOut])
+async def get_waitlist(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Patients see their own entries, doctors the entries naming them, admins all"""
+    queryset = WaitlistEntry.all()
+    if current_user.role == UserRole.PATIENT:
+        queryset = queryset.filter(patient__user_id=current_user.id)
+    elif current_user.role == UserRole.DOCTOR:
+        queryset = queryset.filter(doctor__user_id=current_user.id)
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    entries = await queryset.order_by("window_start", "id")
+    return [WaitlistEntryOut.model_validate(entry) for entry in entries]
+
+@router.delete("/{entry_id}")
+async def leave_waitlist(
+    entry_id: int,
+    current_user: User = Depends(get_current_active_user)
+):
+    entry = await WaitlistEntry.get_or_none(id=entry_id).prefetch_related("patient")
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Waitlist entry not found"
+        )
+    if current_user.role != UserRole.ADMIN and entry.patient.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Can only remove your own waitlist entries"
+        )
+    # Conditional, so an entry the matcher is booking right now stays booked
+    updated = await WaitlistEntry.filter(id=entry_id, status="waiting").update(status="cancelled")
+    if not updated:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Waitlist entry is no longer waiting"
+        )
+    return {"message": "Left the waitlist"}
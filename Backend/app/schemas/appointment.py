@@ -1,8 +1,13 @@
 from tortoise.contrib.pydantic import pydantic_model_creator
 from app.models.appointment import Appointment
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, Literal
 from datetime import datetime
+from uuid import UUID
+from app.utils.recurrence import MAX_SERIES_OCCURRENCES
+
+# Upper bound on appointments per bulk status request
+MAX_BULK_STATUS_IDS = 200
 
 AppointmentOut = pydantic_model_creator(Appointment, name="Appointment")
 AppointmentIn = pydantic_model_creator(Appointment, name="AppointmentIn", exclude_readonly=True)
@@ -12,4 +17,79 @@ class AppointmentCreate(BaseModel):
     doctor_id: int
     start_time: str
     end_time: str
-    status: Optional[str] = "scheduled"
\ No newline at end of file
+    status: Optional[str] = "scheduled"
+    hold_id: Optional[str] = None  # Converts this slot hold into the appointment
+
+class AppointmentReschedule(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    hold_id: Optional[str] = None  # Slot hold covering the new interval
+
+class AppointmentSeriesCreate(BaseModel):
+    patient_id: int
+    doctor_id: int
+    start_time: datetime  # First occurrence
+    end_time: datetime
+    frequency: Literal["daily", "weekly", "monthly"]
+    interval: int = Field(1, ge=1)
+    count: Optional[int] = Field(None, ge=1, le=MAX_SERIES_OCCURRENCES)
+    until: Optional[datetime] = None
+    skip_conflicts: bool = False  # Book the free occurrences instead of rejecting the series
+
+    @model_validator(mode="after")
+    def has_an_end(self):
+        if self.count is None and self.until is None:
+            raise ValueError("Either count or until is required")
+        return self
+
+class SeriesOccurrence(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    status: Literal["created", "conflict", "outside_working_hours"]
+    appointment_id: Optional[int] = None
+
+class AppointmentSeriesOut(BaseModel):
+    series_id: Optional[UUID] = None
+    created: int
+    occurrences: list[SeriesOccurrence]
+
+class SlotHoldCreate(BaseModel):
+    doctor_id: int
+    start_time: datetime
+    end_time: datetime
+
+class SlotHoldOut(BaseModel):
+    hold_id: str
+    doctor_id: int
+    start_time: datetime
+    end_time: datetime
+    expires_at: datetime
+
+class BulkStatusUpdate(BaseModel):
+    appointment_ids: list[int] = Field(..., min_length=1, max_length=MAX_BULK_STATUS_IDS)
+    status: str
+
+class StatusOutcome(BaseModel):
+    appointment_id: int
+    outcome: Literal["updated", "unchanged", "not_found", "forbidden", "conflict"]
+
+class BulkStatusResult(BaseModel):
+    status: str
+    updated: int
+    results: list[StatusOutcome]
+
+class AppointmentChange(BaseModel):
+    id: int  # Appointment ID
+    deleted: bool = False  # Tombstone: the appointment no longer exists
+    doctor_id: int
+    patient_id: int
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    status: Optional[str] = None
+    series_id: Optional[UUID] = None
+    updated_at: datetime
+
+class AppointmentChangeFeed(BaseModel):
+    changes: list[AppointmentChange]
+    next_cursor: str  # Pass back as `since` to continue from here
+    has_more: bool
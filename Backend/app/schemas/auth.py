@@ -11,11 +11,22 @@ class UserRole(str, Enum):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     user_id: int | None = None
     username: str | None = None
     role: str | None = None
+    token_version: int = 0
+    disabled: bool = False
+
+    @property
+    def id(self):
+        """Alias so verified claims can stand in for a User in route handlers"""
+        return self.user_id
 
 class UserBase(BaseModel):
     username: str
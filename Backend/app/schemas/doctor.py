@@ -1,6 +1,8 @@
 from tortoise.contrib.pydantic import pydantic_model_creator
 from app.models.doctor import Doctor
 from pydantic import BaseModel, condecimal
+from datetime import date, datetime
+from typing import Optional
 
 DoctorOut = pydantic_model_creator(Doctor, name="Doctor")
 DoctorIn = pydantic_model_creator(Doctor, name="DoctorIn", exclude_readonly=True)
@@ -11,4 +13,55 @@ class DoctorCreate(BaseModel):
     specialization: str
     contact: str
     experience: int = 0
-    fees: condecimal(max_digits=10, decimal_places=2) = 0.00
\ No newline at end of file
+    fees: condecimal(max_digits=10, decimal_places=2) = 0.00
+
+class TimeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+class DoctorAvailability(BaseModel):
+    doctor_id: int
+    window_start: datetime
+    window_end: datetime
+    duration_minutes: int
+    slots: list[TimeSlot]
+
+class DoctorSlot(BaseModel):
+    doctor_id: int
+    start: datetime
+    end: datetime
+
+class AvailabilitySearchResult(BaseModel):
+    specialization: str
+    mode: str
+    duration_minutes: int
+    slots: list[DoctorSlot]
+
+class DoctorAssignment(BaseModel):
+    doctor_id: int
+    start: datetime
+    end: datetime
+    booked_minutes: int  # In the UTC week of `start`, before this booking
+    fees: condecimal(max_digits=10, decimal_places=2)
+    candidates: int  # Doctors with a free slot in the window
+
+class DayViewPatient(BaseModel):
+    id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: str
+    pic: Optional[str] = None
+
+class DayViewAppointment(BaseModel):
+    id: int
+    start_time: datetime
+    end_time: datetime
+    status: str
+    patient: DayViewPatient
+    medical_record_ids: list[int]
+    has_medical_record: bool
+
+class DoctorDayView(BaseModel):
+    date: date
+    timezone: str
+    appointments: list[DayViewAppointment]
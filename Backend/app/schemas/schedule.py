@@ -0,0 +1,46 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional
+from datetime import date, time
+
+class WeeklyHours(BaseModel):
+    weekday: int = Field(..., ge=0, le=6)  # 0 = Monday
+    start_time: time
+    end_time: time
+
+    class Config:
+        from_attributes = True
+
+    @model_validator(mode="after")
+    def end_after_start(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
+
+class ScheduleExceptionCreate(BaseModel):
+    date: date
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    is_available: bool = False
+    reason: Optional[str] = None
+
+    @model_validator(mode="after")
+    def times_form_a_range(self):
+        if (self.start_time is None) != (self.end_time is None):
+            raise ValueError("start_time and end_time must be given together")
+        if self.start_time is not None and self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        if self.is_available and self.start_time is None:
+            raise ValueError("Extra working hours need a start_time and end_time")
+        return self
+
+class ScheduleExceptionOut(ScheduleExceptionCreate):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class DoctorScheduleOut(BaseModel):
+    doctor_id: int
+    timezone: str
+    weekly: list[WeeklyHours]
+    exceptions: list[ScheduleExceptionOut]
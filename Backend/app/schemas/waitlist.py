@@ -0,0 +1,32 @@
+from pydantic import BaseModel, model_validator
+from typing import Optional
+from datetime import datetime
+
+class WaitlistEntryCreate(BaseModel):
+    patient_id: int
+    doctor_id: Optional[int] = None
+    specialization: Optional[str] = None  # Any doctor of this specialization
+    window_start: datetime
+    window_end: datetime
+
+    @model_validator(mode="after")
+    def has_a_target(self):
+        if (self.doctor_id is None) == (self.specialization is None):
+            raise ValueError("Exactly one of doctor_id or specialization is required")
+        if self.window_end <= self.window_start:
+            raise ValueError("window_end must be after window_start")
+        return self
+
+class WaitlistEntryOut(BaseModel):
+    id: int
+    patient_id: int
+    doctor_id: Optional[int] = None
+    specialization: Optional[str] = None
+    window_start: datetime
+    window_end: datetime
+    status: str
+    appointment_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
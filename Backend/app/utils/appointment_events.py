@@ -0,0 +1,105 @@
+import asyncio
+from fastapi.encoders import jsonable_encoder
+from app.utils.db_events import db_events
+from app.utils.interval_index import interval_index
+from app.utils.waitlist import waitlist_matcher, frees_slot
+from app.utils.event_broker import event_broker
+from app.utils.reminders import reminder_scheduler
+import logging
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY channel carrying appointment changes between workers
+APPOINTMENT_CHANNEL = "appointment_changes"
+# NOTIFY channel relaying push events to clients connected to other workers
+APPOINTMENT_PUSH_CHANNEL = "appointment_push"
+# Events per push notification, keeping payloads under the 8000-byte NOTIFY limit
+PUSH_EVENTS_PER_NOTIFY = 20
+
+# Waitlist backfills still running, referenced until they finish
+_backfills: set[asyncio.Task] = set()
+
+SNAPSHOT_FIELDS = ("id", "doctor_id", "patient_id", "start_time", "end_time", "status")
+
+def snapshot(appointment) -> dict:
+    """Plain-dict copy of the fields in-memory structures track"""
+    if isinstance(appointment, dict):
+        return {field: appointment[field] for field in SNAPSHOT_FIELDS}
+    return {field: getattr(appointment, field) for field in SNAPSHOT_FIELDS}
+
+async def appointments_changed(changes):
+    """
+    Propagate committed appointment changes to in-process structures and to
+    the other workers.
+
+    `changes` is a list of (before, after) snapshots; `before` is None for
+    newly created appointments. Call this after the change has committed.
+    Upcoming slots freed by the changes are then offered to the waitlist in
+    a background task, which propagates any bookings made from it the same
+    way; the caller neither waits for it nor sees its failures.
+    """
+    if not changes:
+        return
+    for before, after in changes:
+        interval_index.apply(after)
+        reminder_scheduler.apply(after)
+    await db_events.publish(APPOINTMENT_CHANNEL, {
+        "doctor_ids": sorted({after["doctor_id"] for _, after in changes})
+    })
+    await push_events(changes)
+    if any(frees_slot(before, after) for before, after in changes):
+        task = asyncio.create_task(backfill_waitlist(changes))
+        _backfills.add(task)
+        task.add_done_callback(_backfills.discard)
+
+async def backfill_waitlist(changes):
+    """Offer the slots freed by `changes` and propagate the bookings made; failures are logged"""
+    try:
+        booked = await waitlist_matcher.backfill(changes)
+        await appointments_changed([(None, snapshot(appointment)) for appointment in booked])
+    except Exception:
+        logger.exception("Waitlist backfill failed")
+
+async def wait_for_backfills():
+    """Let running waitlist backfills finish, e.g. before shutting down"""
+    while _backfills:
+        await asyncio.gather(*_backfills, return_exceptions=True)
+
+async def capacity_changed(doctor_id: int):
+    """The index keeps each doctor's capacity with their intervals; reload both everywhere"""
+    interval_index.invalidate(doctor_id)
+    await db_events.publish(APPOINTMENT_CHANNEL, {"doctor_ids": [doctor_id]})
+
+def handle_remote_changes(payload: dict):
+    for doctor_id in payload.get("doctor_ids", []):
+        interval_index.invalidate(doctor_id)
+
+def event_type(before, after) -> str:
+    if before is None:
+        return "appointment.created"
+    if after["status"] == "cancelled" and before["status"] != "cancelled":
+        return "appointment.cancelled"
+    if after["status"] != before["status"]:
+        return "appointment.status"
+    return "appointment.updated"
+
+def deliver(events):
+    """Fan (type, appointment) events out to the push connections of this worker"""
+    for kind, appointment in events:
+        event_broker.publish(
+            [f"doctor:{appointment['doctor_id']}", f"patient:{appointment['patient_id']}", "all"],
+            kind,
+            appointment
+        )
+
+async def push_events(changes):
+    """Push the changes to connected clients here, then relay them to the other workers"""
+    events = [(event_type(before, after), jsonable_encoder(after)) for before, after in changes]
+    deliver(events)
+    for i in range(0, len(events), PUSH_EVENTS_PER_NOTIFY):
+        await db_events.publish(APPOINTMENT_PUSH_CHANNEL, {
+            "events": events[i:i + PUSH_EVENTS_PER_NOTIFY]
+        })
+
+def handle_remote_push(payload: dict):
+    deliver(payload.get("events", []))
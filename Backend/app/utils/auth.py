@@ -1,11 +1,17 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from tortoise.expressions import Q
+from tortoise.functions import Lower
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
-from app.models.user import User  # Add this import
+from app.models.user import User, UserRole  # Add this import
 from app.schemas.auth import TokenData
+from app.utils.user_cache import user_cache
+from app.utils.hashing import password_hasher
+from app.utils.revocation import revocation_list
+from app.utils.refresh_tokens import revoke_refresh_tokens
+from app.core.config import AUTH_STATELESS
 from dotenv import load_dotenv
 import os
 
@@ -14,24 +20,34 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+async def get_password_hash(password: str):
+    return await password_hasher.hash(password)
+
+async def find_login_user(login: str) -> Optional[User]:
+    """User whose username or email matches `login`, case-insensitively"""
+    # One round trip; the LOWER() lookups are served by the expression
+    # indexes in app/utils/database.py
+    login = login.lower()
+    candidates = await User.annotate(
+        username_lower=Lower("username"),
+        email_lower=Lower("email")
+    ).filter(Q(username_lower=login) | Q(email_lower=login)).limit(2)
+    if not candidates:
+        return None
+    # A username match wins over another account's email, as before
+    return next((c for c in candidates if c.username.lower() == login), candidates[0])
 
 async def authenticate_user(username: str, password: str, role: str = None):
-    # Try to find user by username or email
-    user = await User.get_or_none(username=username)
-    if not user:
-        user = await User.get_or_none(email=username)
-        if not user:
-            return False
+    user = await find_login_user(username)
+    if user is None:
+        return False
     
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
         
     # If role is provided, verify it matches
@@ -55,36 +71,76 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+def create_user_access_token(user: User, expires_delta: Optional[timedelta] = None):
+    """Issue an access token carrying the claims used by claims-only authorization"""
+    return create_access_token(
+        data={
+            "user_id": user.id,
+            "sub": user.username,
+            "role": user.role.value if isinstance(user.role, UserRole) else user.role,
+            "ver": user.token_version
+        },
+        expires_delta=expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def decode_token_claims(token: str) -> TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: int = payload.get("user_id")
         if user_id is None:
             raise credentials_exception
-        token_data = TokenData(
+        return TokenData(
             user_id=user_id,
             username=payload.get("username"),
-            role=payload.get("role")
+            role=payload.get("role"),
+            token_version=payload.get("ver", 0)
         )
     except JWTError:
         raise credentials_exception
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    token_data = decode_token_claims(token)
     
-    user = await User.get_or_none(id=token_data.user_id)
-    if user is None:
+    user = await user_cache.get_user(token_data.user_id)
+    if user is None or token_data.token_version < user.token_version:
         raise credentials_exception
     return user
 
+async def get_current_principal(token: str = Depends(oauth2_scheme)):
+    """
+    Resolve the caller for role-gated dependencies.
+
+    With AUTH_STATELESS enabled the verified claims are returned as-is and
+    checked against the revocation list instead of loading the User row;
+    otherwise this behaves like get_current_user.
+    """
+    if not AUTH_STATELESS:
+        return await get_current_user(token)
+
+    token_data = decode_token_claims(token)
+    await revocation_list.refresh_if_stale()
+    if revocation_list.is_revoked(token_data.user_id, token_data.token_version):
+        raise credentials_exception
+    return token_data
+
+async def revoke_user_tokens(user: User):
+    """Invalidate every access and refresh token issued to the user so far"""
+    user.token_version += 1
+    await user.save(update_fields=["token_version"])
+    await revoke_refresh_tokens(user.id)
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-async def get_current_doctor(current_user: User = Depends(get_current_user)):
+async def get_current_doctor(current_user: User = Depends(get_current_principal)):
     if current_user.role != "Doctor":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -92,7 +148,7 @@ async def get_current_doctor(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
-async def get_current_admin(current_user: User = Depends(get_current_user)):
+async def get_current_admin(current_user: User = Depends(get_current_principal)):
     if current_user.role != "Admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
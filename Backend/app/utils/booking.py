@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, timezone
+from tortoise.exceptions import IntegrityError
+
+# Statuses that occupy one of the doctor's seats; must match the WHERE
+# clause of the exclusion constraint in app/utils/database.py
+ACTIVE_STATUSES = ["scheduled"]
+VALID_STATUSES = ["scheduled", "completed", "cancelled", "no_show"]
+
+MIN_APPOINTMENT_DURATION = timedelta(minutes=15)
+
+OVERLAP_CONSTRAINT = "appointments_no_overlap"
+
+# First key of the two-part advisory lock taken per doctor while seats are
+# chosen; the second is the doctor ID
+BOOKING_LOCK_NAMESPACE = 0x626B
+
+def is_overlap_violation(exc: IntegrityError) -> bool:
+    """True if the insert/update was rejected by the no-overlap exclusion constraint"""
+    cause = exc.args[0] if exc.args else None
+    if getattr(cause, "constraint_name", None) == OVERLAP_CONSTRAINT:
+        return True
+    return OVERLAP_CONSTRAINT in str(exc)
+
+def as_utc(value: datetime) -> datetime:
+    """Normalise naive (assumed UTC) and aware datetimes so they compare safely"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def free_windows(busy, window_start: datetime, window_end: datetime, min_length: timedelta):
+    """
+    Gaps of at least `min_length` inside [window_start, window_end).
+
+    `busy` must be (start, end) pairs sorted by start; overlapping or
+    touching intervals are handled, so a single pass is enough.
+    """
+    free = []
+    cursor = window_start
+    for start, end in busy:
+        if start >= window_end:
+            break
+        if start - cursor >= min_length:
+            free.append((cursor, start))
+        if end > cursor:
+            cursor = end
+    if window_end - cursor >= min_length:
+        free.append((cursor, window_end))
+    return free
+
+def merge_intervals(intervals):
+    """Sort and coalesce overlapping or touching (start, end) pairs"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def subtract_interval(intervals, start, end):
+    """Remove [start, end) from a list of disjoint intervals"""
+    remaining = []
+    for s, e in intervals:
+        if e <= start or s >= end:
+            remaining.append((s, e))
+            continue
+        if s < start:
+            remaining.append((s, start))
+        if e > end:
+            remaining.append((end, e))
+    return remaining
+
+def complement(intervals, window_start: datetime, window_end: datetime):
+    """Parts of [window_start, window_end) not covered by sorted disjoint intervals"""
+    gaps = []
+    cursor = window_start
+    for start, end in intervals:
+        if start > cursor:
+            gaps.append((cursor, min(start, window_end)))
+        cursor = max(cursor, end)
+        if cursor >= window_end:
+            break
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    return gaps
+
+def max_concurrency(intervals, start: datetime, end: datetime) -> int:
+    """
+    Most of `intervals` in progress at any one instant of [start, end).
+
+    Sweep over the sorted endpoints of the intervals touching the window:
+    +1 at each start, -1 at each end. Ends sort before starts at the same
+    instant, since back-to-back appointments do not overlap.
+    """
+    events = []
+    for s, e in intervals:
+        if s < end and e > start:
+            events.append((max(s, start), 1))
+            events.append((e, -1))
+    events.sort()
+    peak = count = 0
+    for _, delta in events:
+        count += delta
+        peak = max(peak, count)
+    return peak
+
+def saturated_intervals(intervals, capacity: int):
+    """Sorted disjoint spans during which at least `capacity` of `intervals` overlap"""
+    events = sorted([(s, 1) for s, _ in intervals] + [(e, -1) for _, e in intervals])
+    saturated = []
+    count = 0
+    for time, delta in events:
+        count += delta
+        if delta > 0 and count == capacity:
+            opened = time
+        elif delta < 0 and count == capacity - 1:
+            if saturated and saturated[-1][1] == opened:
+                saturated[-1] = (saturated[-1][0], time)  # Touching span
+            elif time > opened:
+                saturated.append((opened, time))
+    return saturated
@@ -0,0 +1,218 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, status
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
+from app.models.appointment import Appointment
+from app.models.doctor import Doctor
+from app.utils.booking import (
+    ACTIVE_STATUSES, BOOKING_LOCK_NAMESPACE, as_utc, is_overlap_violation, max_concurrency
+)
+from app.utils.slot_holds import slot_holds, publish_hold_removed
+from app.utils.appointment_events import appointments_changed, snapshot
+from app.core.config import BOOKING_SERIALIZER_ENABLED, BOOKING_BATCH_SIZE, BOOKING_ACTOR_IDLE_SECONDS
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BookingRequest:
+    patient_id: int
+    doctor_id: int
+    start_time: datetime
+    end_time: datetime
+    status: str
+    hold_id: Optional[str] = None  # The caller's claimed hold, converted by this booking
+
+
+def slot_taken() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Time slot already booked"
+    )
+
+
+class BookingSerializer:
+    """
+    Optional single-writer path for bookings.
+
+    Each doctor with pending bookings gets one asyncio task draining a
+    queue, so bookings for that doctor never race each other inside a
+    worker. The task takes up to `batch_size` queued requests at a time,
+    locks the doctor across workers with a transaction-level advisory lock,
+    reads the doctor's capacity and busy intervals for the batch's span
+    once, and accepts requests in arrival order while a seat is free,
+    counting other people's slot holds as taken. All of them are committed
+    together, then the task completes their holds and propagates the new
+    appointments itself, so a caller that goes away loses nothing.
+    Contention turns into a queue and one commit per batch instead of one
+    per booking.
+
+    Bookings made outside the serializer (series, waitlist backfill) take
+    the same lock in the seat trigger when they insert, so they wait for a
+    batch in progress rather than slipping in between its read and commit.
+    If the batch still fails it is retried one request at a time, and the
+    exclusion constraint stays the final arbiter.
+    """
+
+    def __init__(self, enabled: bool, batch_size: int, idle_timeout: float):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self._actors: dict[int, tuple[asyncio.Queue, asyncio.Task]] = {}
+        self.batches = 0
+        self.booked = 0
+        self.rejected = 0
+        self.largest_batch = 0
+
+    async def submit(self, request: BookingRequest) -> Appointment:
+        """Queue a booking behind the doctor's earlier ones; raises a 409 if the slot is taken"""
+        actor = self._actors.get(request.doctor_id)
+        if actor is None:
+            queue = asyncio.Queue()
+            actor = (queue, asyncio.create_task(self._run(request.doctor_id, queue)))
+            self._actors[request.doctor_id] = actor
+        future = asyncio.get_running_loop().create_future()
+        actor[0].put_nowait((request, future))
+        return await future
+
+    async def _run(self, doctor_id: int, queue: asyncio.Queue):
+        while True:
+            try:
+                first = await asyncio.wait_for(queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                # Nothing can be queued between the timeout and this check
+                if queue.empty():
+                    del self._actors[doctor_id]
+                    return
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._process(doctor_id, batch)
+            except Exception as e:
+                logger.exception(f"Booking batch for doctor {doctor_id} failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _process(self, doctor_id: int, batch):
+        # Requests whose client went away are dropped before touching the database
+        batch = [(request, future) for request, future in batch if not future.done()]
+        if not batch:
+            return
+        try:
+            outcomes = await self._commit(doctor_id, [request for request, _ in batch])
+        except IntegrityError as e:
+            if not is_overlap_violation(e):
+                raise
+            # Someone booked outside the serializer; isolate the clashing requests
+            outcomes = []
+            for request, _ in batch:
+                try:
+                    outcomes += await self._commit(doctor_id, [request])
+                except IntegrityError as e:
+                    if not is_overlap_violation(e):
+                        raise
+                    outcomes.append(None)
+
+        await self._propagate([
+            (request, appointment) for (request, _), appointment in zip(batch, outcomes) if appointment is not None
+        ])
+        for (_, future), appointment in zip(batch, outcomes):
+            if appointment is None:
+                self.rejected += 1
+            else:
+                self.booked += 1
+            if future.done():
+                continue
+            if appointment is None:
+                future.set_exception(slot_taken())
+            else:
+                future.set_result(appointment)
+
+    async def _commit(self, doctor_id: int, requests: list[BookingRequest]) -> list[Optional[Appointment]]:
+        """Book the requests that fit, in order, in one transaction; None marks a rejected one"""
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(requests))
+        span_start = min(as_utc(request.start_time) for request in requests)
+        span_end = max(as_utc(request.end_time) for request in requests)
+        async with in_transaction() as connection:
+            await connection.execute_query(
+                "SELECT pg_advisory_xact_lock($1, $2)", [BOOKING_LOCK_NAMESPACE, doctor_id]
+            )
+            capacity = await Doctor.filter(id=doctor_id).using_db(connection).values_list("capacity", flat=True)
+            capacity = capacity[0] if capacity else 1
+            busy = [
+                (as_utc(start), as_utc(end))
+                for start, end in await Appointment.filter(
+                    doctor_id=doctor_id,
+                    status__in=ACTIVE_STATUSES,
+                    start_time__lt=span_end,
+                    end_time__gt=span_start
+                ).using_db(connection).values_list("start_time", "end_time")
+            ]
+            outcomes = []
+            converted = set()  # Holds of requests accepted earlier in the batch
+            for request in requests:
+                start, end = as_utc(request.start_time), as_utc(request.end_time)
+                if request.status in ACTIVE_STATUSES:
+                    held = [
+                        (hold.start_time, hold.end_time)
+                        for hold in slot_holds.overlapping(doctor_id, start, end, exclude_id=request.hold_id)
+                        if hold.id not in converted
+                    ]
+                    if max_concurrency(busy + held, start, end) >= capacity:
+                        outcomes.append(None)
+                        continue
+                    busy.append((start, end))
+                    if request.hold_id is not None:
+                        converted.add(request.hold_id)
+                outcomes.append(await Appointment.create(
+                    patient_id=request.patient_id,
+                    doctor_id=doctor_id,
+                    start_time=request.start_time,
+                    end_time=request.end_time,
+                    status=request.status,
+                    using_db=connection
+                ))
+        return outcomes
+
+    async def _propagate(self, booked: list[tuple[BookingRequest, Appointment]]):
+        """Complete the converted holds and announce the committed bookings"""
+        try:
+            for request, _ in booked:
+                hold = slot_holds.get(request.hold_id) if request.hold_id is not None else None
+                if hold is not None:
+                    slot_holds.complete(hold)
+                    await publish_hold_removed(hold.id)
+            await appointments_changed([(None, snapshot(appointment)) for _, appointment in booked])
+        except Exception:
+            logger.exception("Propagating a committed booking batch failed")
+
+    async def stop(self):
+        for _, task in self._actors.values():
+            task.cancel()
+        self._actors.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "actors": len(self._actors),
+            "queued": sum(queue.qsize() for queue, _ in self._actors.values()),
+            "batches": self.batches,
+            "booked": self.booked,
+            "rejected": self.rejected,
+            "largest_batch": self.largest_batch,
+        }
+
+
+booking_serializer = BookingSerializer(
+    enabled=BOOKING_SERIALIZER_ENABLED,
+    batch_size=BOOKING_BATCH_SIZE,
+    idle_timeout=BOOKING_ACTOR_IDLE_SECONDS,
+)
@@ -0,0 +1,263 @@
+from tortoise.transactions import in_transaction
+from app.utils.booking import BOOKING_LOCK_NAMESPACE
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Key of the advisory lock that serialises schema updates across workers
+SCHEMA_LOCK_KEY = 0x736368656D61
+
+# Idempotent DDL applied on startup, after Tortoise has generated any missing
+# tables. generate_schemas only creates tables, so columns, indexes and
+# constraints added to existing models are brought up to date here.
+# Triggers use CREATE OR REPLACE TRIGGER, so Postgres 14 or later is needed.
+SCHEMA_UPDATES = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INT NOT NULL DEFAULT 0",
+    # Case-insensitive username/email login lookup (authenticate_user)
+    "CREATE INDEX IF NOT EXISTS users_username_lower_idx ON users (LOWER(username))",
+    "CREATE INDEX IF NOT EXISTS users_email_lower_idx ON users (LOWER(email))",
+    # Keyset pagination of appointments in (start_time, id) order
+    "CREATE INDEX IF NOT EXISTS appointments_start_idx ON appointments (start_time, id)",
+    "CREATE INDEX IF NOT EXISTS appointments_doctor_start_idx ON appointments (doctor_id, start_time, id)",
+    "CREATE INDEX IF NOT EXISTS appointments_patient_start_idx ON appointments (patient_id, start_time, id)",
+    # Recurring appointment series
+    "ALTER TABLE appointments ADD COLUMN IF NOT EXISTS series_id UUID",
+    "CREATE INDEX IF NOT EXISTS appointments_series_idx ON appointments (series_id) WHERE series_id IS NOT NULL",
+    # Past-due scan of the appointment sweeper
+    "CREATE INDEX IF NOT EXISTS appointments_scheduled_end_idx ON appointments (end_time) WHERE status = 'scheduled'",
+    "CREATE INDEX IF NOT EXISTS medical_records_appointment_idx ON medical_records (appointment_id)",
+    # Waitlist matching looks up waiting entries by doctor or specialization,
+    # then by desired window
+    "CREATE INDEX IF NOT EXISTS waitlist_doctor_window_idx ON waitlist_entries (doctor_id, window_start, window_end) WHERE status = 'waiting'",
+    # Specializations match case-insensitively; the expression is the one
+    # Tortoise generates for specialization__iexact
+    "DROP INDEX IF EXISTS waitlist_specialization_window_idx",
+    "CREATE INDEX IF NOT EXISTS waitlist_specialization_upper_window_idx ON waitlist_entries (UPPER(CAST(specialization AS VARCHAR)), window_start, window_end) WHERE status = 'waiting' AND doctor_id IS NULL",
+    # Change feed (GET /appointments/changes). Every insert and update stamps
+    # the row with updated_at, the writing transaction's ID and the next
+    # value of a shared sequence, and every delete leaves a tombstone stamped
+    # the same way. The feed pages in (transaction ID, sequence) order and
+    # stops below the oldest transaction still running, so a slow committer
+    # cannot be overtaken. Triggers cover bulk and raw-SQL updates too.
+    "CREATE SEQUENCE IF NOT EXISTS appointment_change_seq",
+    "ALTER TABLE appointments ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "ALTER TABLE appointments ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT nextval('appointment_change_seq')",
+    "ALTER TABLE appointments ADD COLUMN IF NOT EXISTS change_xid xid8 NOT NULL DEFAULT pg_current_xact_id()",
+    "DROP INDEX IF EXISTS appointments_change_seq_idx",
+    "DROP INDEX IF EXISTS appointments_doctor_change_seq_idx",
+    "DROP INDEX IF EXISTS appointments_patient_change_seq_idx",
+    "CREATE INDEX IF NOT EXISTS appointments_change_idx ON appointments (change_xid, change_seq)",
+    "CREATE INDEX IF NOT EXISTS appointments_doctor_change_idx ON appointments (doctor_id, change_xid, change_seq)",
+    "CREATE INDEX IF NOT EXISTS appointments_patient_change_idx ON appointments (patient_id, change_xid, change_seq)",
+    """
+    CREATE TABLE IF NOT EXISTS appointment_tombstones (
+        change_seq BIGINT PRIMARY KEY,
+        appointment_id INT NOT NULL,
+        doctor_id INT NOT NULL,
+        patient_id INT NOT NULL,
+        deleted_at TIMESTAMPTZ NOT NULL
+    )
+    """,
+    "ALTER TABLE appointment_tombstones ADD COLUMN IF NOT EXISTS change_xid xid8 NOT NULL DEFAULT pg_current_xact_id()",
+    "DROP INDEX IF EXISTS appointment_tombstones_doctor_idx",
+    "DROP INDEX IF EXISTS appointment_tombstones_patient_idx",
+    "CREATE INDEX IF NOT EXISTS appointment_tombstones_change_idx ON appointment_tombstones (change_xid, change_seq)",
+    "CREATE INDEX IF NOT EXISTS appointment_tombstones_doctor_change_idx ON appointment_tombstones (doctor_id, change_xid, change_seq)",
+    "CREATE INDEX IF NOT EXISTS appointment_tombstones_patient_change_idx ON appointment_tombstones (patient_id, change_xid, change_seq)",
+    """
+    CREATE OR REPLACE FUNCTION appointments_track_change() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at := clock_timestamp();
+        NEW.change_seq := nextval('appointment_change_seq');
+        NEW.change_xid := pg_current_xact_id();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION appointments_record_tombstone() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO appointment_tombstones (change_seq, appointment_id, doctor_id, patient_id, deleted_at)
+        VALUES (nextval('appointment_change_seq'), OLD.id, OLD.doctor_id, OLD.patient_id, clock_timestamp());
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER appointments_track_change BEFORE INSERT OR UPDATE ON appointments
+        FOR EACH ROW EXECUTE FUNCTION appointments_track_change()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER appointments_record_tombstone AFTER DELETE ON appointments
+        FOR EACH ROW EXECUTE FUNCTION appointments_record_tombstone()
+    """,
+    # Booked minutes per doctor and UTC week (Monday), for least-loaded
+    # assignment. Kept current by a trigger on every appointment write, so
+    # reads never aggregate appointments; cancelled ones do not count. The
+    # counters are backfilled once, when the trigger is first created.
+    """
+    CREATE TABLE IF NOT EXISTS doctor_weekly_load (
+        doctor_id INT NOT NULL,
+        week_start DATE NOT NULL,
+        booked_minutes INT NOT NULL DEFAULT 0,
+        appointments INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (doctor_id, week_start)
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION appointments_track_load() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW.doctor_id = OLD.doctor_id AND NEW.start_time = OLD.start_time
+                AND NEW.end_time = OLD.end_time AND (NEW.status = 'cancelled') = (OLD.status = 'cancelled') THEN
+            RETURN NULL;  -- Load unchanged, e.g. scheduled -> completed
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status <> 'cancelled' THEN
+            INSERT INTO doctor_weekly_load AS weekly (doctor_id, week_start, booked_minutes, appointments)
+            VALUES (
+                OLD.doctor_id, date_trunc('week', OLD.start_time AT TIME ZONE 'UTC')::date,
+                -(EXTRACT(EPOCH FROM OLD.end_time - OLD.start_time) / 60)::int, -1
+            )
+            ON CONFLICT (doctor_id, week_start) DO UPDATE
+            SET booked_minutes = weekly.booked_minutes + EXCLUDED.booked_minutes,
+                appointments = weekly.appointments + EXCLUDED.appointments;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status <> 'cancelled' THEN
+            INSERT INTO doctor_weekly_load AS weekly (doctor_id, week_start, booked_minutes, appointments)
+            VALUES (
+                NEW.doctor_id, date_trunc('week', NEW.start_time AT TIME ZONE 'UTC')::date,
+                (EXTRACT(EPOCH FROM NEW.end_time - NEW.start_time) / 60)::int, 1
+            )
+            ON CONFLICT (doctor_id, week_start) DO UPDATE
+            SET booked_minutes = weekly.booked_minutes + EXCLUDED.booked_minutes,
+                appointments = weekly.appointments + EXCLUDED.appointments;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'appointments_track_load') THEN
+            -- No appointment writes between creating the trigger and the backfill
+            LOCK TABLE appointments IN SHARE ROW EXCLUSIVE MODE;
+            CREATE TRIGGER appointments_track_load
+                AFTER INSERT OR DELETE OR UPDATE OF doctor_id, start_time, end_time, status ON appointments
+                FOR EACH ROW EXECUTE FUNCTION appointments_track_load();
+            DELETE FROM doctor_weekly_load;
+            INSERT INTO doctor_weekly_load (doctor_id, week_start, booked_minutes, appointments)
+            SELECT doctor_id, date_trunc('week', start_time AT TIME ZONE 'UTC')::date,
+                   SUM((EXTRACT(EPOCH FROM end_time - start_time) / 60)::int), COUNT(*)
+            FROM appointments
+            WHERE status <> 'cancelled'
+            GROUP BY 1, 2;
+        END IF;
+    END
+    $$
+    """,
+    # Reminders sent, one row per appointment, lead time and start time
+    # (a rescheduled appointment is reminded again). Claiming a row before
+    # sending keeps workers and restarts from sending a reminder twice.
+    """
+    CREATE TABLE IF NOT EXISTS appointment_reminders (
+        appointment_id INT NOT NULL,
+        lead_minutes INT NOT NULL,
+        start_time TIMESTAMPTZ NOT NULL,
+        sent_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (appointment_id, lead_minutes, start_time)
+    )
+    """,
+    # Slot holds being converted into appointments. Holds live in memory on
+    # every worker, so the primary key decides which worker converts one.
+    # Rows are kept until the hold would have expired.
+    """
+    CREATE TABLE IF NOT EXISTS slot_hold_claims (
+        hold_id TEXT PRIMARY KEY,
+        expires_at TIMESTAMPTZ NOT NULL
+    )
+    """,
+    # Schedule templates are always read per doctor
+    "CREATE INDEX IF NOT EXISTS doctor_schedules_doctor_idx ON doctor_schedules (doctor_id, weekday)",
+    "CREATE INDEX IF NOT EXISTS schedule_exceptions_doctor_idx ON schedule_exceptions (doctor_id, date)",
+    # Multi-capacity doctors. Each active appointment takes one of the
+    # doctor's `capacity` seats; a trigger gives it the lowest seat that is
+    # free for its whole time range, or seat 0 when none is, so the
+    # exclusion constraint below rejects it. It takes the doctor's booking
+    # lock first, held until commit, so concurrent bookings of one doctor
+    # pick seats one after another instead of all seeing the same seat free.
+    "ALTER TABLE doctors ADD COLUMN IF NOT EXISTS capacity INT NOT NULL DEFAULT 1",
+    "ALTER TABLE appointments ADD COLUMN IF NOT EXISTS seat INT NOT NULL DEFAULT 0",
+    f"""
+    CREATE OR REPLACE FUNCTION appointments_assign_seat() RETURNS trigger AS $$
+    DECLARE
+        seats INT;
+        free_seat INT;
+    BEGIN
+        IF NEW.status <> 'scheduled' THEN
+            RETURN NEW;
+        END IF;
+        IF TG_OP = 'UPDATE' AND OLD.status = 'scheduled' AND NEW.doctor_id = OLD.doctor_id
+                AND NEW.start_time = OLD.start_time AND NEW.end_time = OLD.end_time THEN
+            RETURN NEW;  -- Same booking, keeps its seat
+        END IF;
+        PERFORM pg_advisory_xact_lock({BOOKING_LOCK_NAMESPACE}, NEW.doctor_id);
+        SELECT capacity INTO seats FROM doctors WHERE id = NEW.doctor_id;
+        SELECT s INTO free_seat FROM generate_series(0, GREATEST(COALESCE(seats, 1), 1) - 1) AS s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM appointments AS a
+            WHERE a.doctor_id = NEW.doctor_id
+              AND a.seat = s
+              AND a.status = 'scheduled'
+              AND a.id IS DISTINCT FROM NEW.id
+              AND tstzrange(a.start_time, a.end_time, '[)') && tstzrange(NEW.start_time, NEW.end_time, '[)')
+        )
+        ORDER BY s
+        LIMIT 1;
+        NEW.seat := COALESCE(free_seat, 0);
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER appointments_assign_seat BEFORE INSERT OR UPDATE ON appointments
+        FOR EACH ROW EXECUTE FUNCTION appointments_assign_seat()
+    """,
+    # No two active appointments of one doctor may overlap on the same seat,
+    # so at most `capacity` overlap at any time. The GiST index behind the
+    # constraint also serves range-overlap lookups. A constraint from before
+    # seats existed is replaced. Existing overlapping rows are reported
+    # instead of failing startup.
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conname = 'appointments_no_overlap' AND pg_get_constraintdef(oid) NOT LIKE '%seat%'
+        ) THEN
+            ALTER TABLE appointments DROP CONSTRAINT appointments_no_overlap;
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'appointments_no_overlap') THEN
+            ALTER TABLE appointments ADD CONSTRAINT appointments_no_overlap
+                EXCLUDE USING gist (doctor_id WITH =, seat WITH =, tstzrange(start_time, end_time, '[)') WITH &&)
+                WHERE (status = 'scheduled');
+        END IF;
+    EXCEPTION WHEN exclusion_violation THEN
+        RAISE WARNING 'appointments_no_overlap not created: existing appointments overlap';
+    END
+    $$
+    """,
+]
+
+
+async def apply_schema_updates(connection_name: str = "default"):
+    """
+    Apply SCHEMA_UPDATES in one transaction. Workers starting together queue
+    on an advisory lock, so the first one makes the changes and the others
+    find them committed; one-off steps such as the load backfill run once.
+    """
+    async with in_transaction(connection_name) as connection:
+        await connection.execute_query("SELECT pg_advisory_xact_lock($1)", [SCHEMA_LOCK_KEY])
+        for statement in SCHEMA_UPDATES:
+            await connection.execute_script(statement)
+    logger.info(f"Applied {len(SCHEMA_UPDATES)} schema updates")
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import uuid
+from collections import defaultdict
+import asyncpg
+from tortoise import Tortoise
+from app.core.config import DATABASE_URL
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in notifications so it can skip its own messages
+WORKER_ID = uuid.uuid4().hex
+
+RECONNECT_DELAY_SECONDS = 5
+
+
+class DatabaseEvents:
+    """
+    Cross-worker notifications over Postgres LISTEN/NOTIFY.
+
+    Each worker keeps one dedicated asyncpg connection for LISTEN; messages
+    are sent with pg_notify on the regular Tortoise pool, so a NOTIFY issued
+    inside a transaction is only delivered once it commits. Notifications
+    sent while the listener is disconnected are lost, so reset callbacks run
+    after every (re)connect to let caches drop state they can no longer
+    trust.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._handlers = defaultdict(list)  # channel -> [(handler, include_own)]
+        self._reset_callbacks = []
+        self._connection = None
+        self._reconnect_task = None
+        self._closing = False
+        self.received = 0
+        self.published = 0
+
+    def subscribe(self, channel: str, handler, include_own: bool = False):
+        """Call handler(payload) for every message on channel"""
+        self._handlers[channel].append((handler, include_own))
+
+    def on_reset(self, callback):
+        self._reset_callbacks.append(callback)
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self):
+        self._closing = False
+        try:
+            await self._connect()
+        except (OSError, asyncpg.PostgresError) as e:
+            logger.warning(f"Database event listener unavailable: {e}")
+            self._schedule_reconnect()
+
+    async def stop(self):
+        self._closing = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def publish(self, channel: str, payload: dict):
+        message = json.dumps({**payload, "origin": WORKER_ID}, default=str)
+        await Tortoise.get_connection("default").execute_query(
+            "SELECT pg_notify($1, $2)", [channel, message]
+        )
+        self.published += 1
+
+    async def _connect(self):
+        self._connection = await asyncpg.connect(self.dsn)
+        self._connection.add_termination_listener(self._on_terminated)
+        for channel in self._handlers:
+            await self._connection.add_listener(channel, self._dispatch)
+        for callback in self._reset_callbacks:
+            callback()
+        logger.info(f"Listening for database events on {sorted(self._handlers)}")
+
+    def _on_terminated(self, connection):
+        self._connection = None
+        if not self._closing:
+            logger.warning("Database event listener disconnected")
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._closing:
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            try:
+                await self._connect()
+                return
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning(f"Database event listener reconnect failed: {e}")
+
+    def _dispatch(self, connection, pid, channel, message):
+        self.received += 1
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            logger.warning(f"Ignoring malformed notification on {channel}")
+            return
+        own = payload.get("origin") == WORKER_ID
+        for handler, include_own in self._handlers[channel]:
+            if own and not include_own:
+                continue
+            try:
+                result = handler(payload)
+                if asyncio.iscoroutine(result):
+                    asyncio.create_task(result)
+            except Exception:
+                logger.exception(f"Handler for {channel} failed")
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": WORKER_ID,
+            "connected": self.connected,
+            "channels": sorted(self._handlers),
+            "received": self.received,
+            "published": self.published,
+        }
+
+
+db_events = DatabaseEvents(DATABASE_URL)
@@ -0,0 +1,34 @@
+from datetime import date, datetime, timedelta
+from tortoise import Tortoise
+from app.utils.booking import as_utc
+
+# Counters maintained by the appointments_track_load trigger (app/utils/database.py)
+WEEKLY_LOAD_SQL = """
+SELECT doctor_id, week_start, booked_minutes
+FROM doctor_weekly_load
+WHERE doctor_id = ANY($1::int[]) AND week_start = ANY($2::date[])
+"""
+
+def week_start(moment: datetime) -> date:
+    """Monday of the UTC week containing `moment`, the bucket the counters use"""
+    day = as_utc(moment).date()
+    return day - timedelta(days=day.weekday())
+
+async def booked_minutes(keys) -> dict:
+    """
+    {(doctor_id, week_start): minutes booked} for the given pairs in one
+    indexed lookup; pairs without a counter row have nothing booked.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        WEEKLY_LOAD_SQL,
+        [sorted({doctor_id for doctor_id, _ in keys}), sorted({week for _, week in keys})]
+    )
+    load = {key: 0 for key in keys}
+    for row in rows:
+        key = (row["doctor_id"], row["week_start"])
+        if key in load:
+            load[key] = row["booked_minutes"]
+    return load
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from collections import defaultdict
+from app.core.config import EVENT_QUEUE_SIZE
+
+
+class Subscription:
+    """One connected client: a bounded queue of (event type, JSON data) pairs"""
+
+    def __init__(self, topics: list[str], queue_size: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False  # Fell behind; the connection should be closed
+
+
+class EventBroker:
+    """
+    In-process pub/sub fan-out for push connections.
+
+    Subscriptions are indexed by topic ("doctor:<id>", "patient:<id>", "all"),
+    so publishing touches only the subscribers of the event's topics and an
+    idle connection costs one small queue and no task or timer of its own.
+    Each event is serialised once, however many clients receive it. A client
+    whose queue fills up is flagged as overflowed instead of buffering
+    without bound; it is disconnected and resyncs from the change feed.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._topics: dict[str, set[Subscription]] = defaultdict(set)
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, topics: list[str]) -> Subscription:
+        subscription = Subscription(topics, self.queue_size)
+        for topic in topics:
+            self._topics[topic].add(subscription)
+        self.connections += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+        self.connections -= 1
+
+    def publish(self, topics: list[str], event_type: str, data: dict):
+        message = (event_type, json.dumps(data, default=str))
+        seen = set()
+        for topic in topics:
+            for subscription in self._topics.get(topic, ()):
+                if subscription in seen:
+                    continue
+                seen.add(subscription)
+                try:
+                    subscription.queue.put_nowait(message)
+                    self.delivered += 1
+                except asyncio.QueueFull:
+                    subscription.overflowed = True
+                    self.dropped += 1
+        self.published += 1
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "topics": len(self._topics),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+event_broker = EventBroker(queue_size=EVENT_QUEUE_SIZE)
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Optional
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from tortoise.exceptions import IntegrityError
+from app.models.idempotency_key import IdempotencyKey
+from app.utils.booking import as_utc
+from app.core.config import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_WAIT_SECONDS
+
+POLL_INTERVAL_SECONDS = 0.1
+PURGE_INTERVAL_SECONDS = 300
+# An in-flight row this old belongs to a worker that died mid-request
+ABANDONED_AFTER = timedelta(minutes=5)
+# HTTP errors below this are outcomes and are replayed; server errors release the key
+FIRST_UNSTORED_STATUS = 500
+
+
+class IdempotencyStore:
+    """
+    Replays the responses of requests sent with an Idempotency-Key header.
+
+    The first request with a key inserts an in-flight row (the unique
+    (user, key) constraint lets exactly one insert win), runs, and stores
+    its response. A retry of a completed request gets the stored response
+    back without running the handler again. A duplicate that arrives while
+    the first is still running waits for it: on an asyncio future if both
+    are on this worker, otherwise by polling the row.
+
+    Rejections (HTTPExceptions below 500) are stored and replayed like
+    successes. Any other failure deletes the row so the client can simply
+    retry. A row left in flight by a worker that died is never taken over
+    before it expires: the handler may have committed its side effect, so
+    retries get a 409 saying the outcome is unknown.
+    """
+
+    def __init__(self, ttl: float, wait: float):
+        self.ttl = timedelta(seconds=ttl)
+        self.wait = wait
+        self._in_flight: dict[tuple[int, str], asyncio.Future] = {}
+        self._last_purge = 0.0
+        self.executed = 0
+        self.replayed = 0
+        self.duplicates = 0
+
+    async def run(self, key: Optional[str], user_id: int, endpoint: str, payload: BaseModel, handler, status_code: int = 200):
+        """Run handler() at most once per (user, key); `payload` is the request body"""
+        if key is None:
+            return await handler()
+        request_hash = hashlib.sha256(
+            f"{endpoint}:{payload.model_dump_json()}".encode()
+        ).hexdigest()
+
+        deadline = monotonic() + self.wait
+        record = await self._claim(key, user_id, endpoint, request_hash)
+        if record is not None:
+            self.duplicates += 1
+        while record is not None:
+            if record.request_hash != request_hash:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            if record.status_code is not None:
+                self.replayed += 1
+                if record.status_code >= status.HTTP_400_BAD_REQUEST:
+                    # Rendered by the app's error handler, like the original
+                    raise HTTPException(
+                        status_code=record.status_code,
+                        detail=record.response["detail"],
+                        headers={"Idempotent-Replayed": "true"}
+                    )
+                return JSONResponse(
+                    content=record.response,
+                    status_code=record.status_code,
+                    headers={"Idempotent-Replayed": "true"}
+                )
+            if as_utc(record.created_at) <= datetime.now(timezone.utc) - ABANDONED_AFTER:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="The request with this Idempotency-Key did not finish and its outcome is unknown; "
+                           "check before retrying with a new key"
+                )
+            if monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress"
+                )
+            await self._wait_for(user_id, key, deadline)
+            record = await IdempotencyKey.get_or_none(user_id=user_id, key=key)
+            if record is None:
+                # The first request failed and released the key; run it ourselves
+                record = await self._claim(key, user_id, endpoint, request_hash)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[(user_id, key)] = future
+        try:
+            result = await handler()
+        except HTTPException as e:
+            if e.status_code >= FIRST_UNSTORED_STATUS:
+                await self._release(user_id, key)
+            else:
+                await self._store(user_id, key, e.status_code, {"detail": e.detail})
+            raise
+        except BaseException:
+            await self._release(user_id, key)
+            raise
+        else:
+            await self._store(user_id, key, status_code, result)
+            return result
+        finally:
+            del self._in_flight[(user_id, key)]
+            future.set_result(None)
+
+    async def _claim(self, key: str, user_id: int, endpoint: str, request_hash: str) -> Optional[IdempotencyKey]:
+        """Insert the in-flight row, or return the row already holding the key"""
+        now = datetime.now(timezone.utc)
+        await self._purge(now)
+        while True:
+            try:
+                await IdempotencyKey.create(
+                    user_id=user_id,
+                    key=key,
+                    endpoint=endpoint,
+                    request_hash=request_hash,
+                    expires_at=now + self.ttl
+                )
+                return None
+            except IntegrityError:
+                pass
+            record = await IdempotencyKey.get_or_none(user_id=user_id, key=key)
+            if record is None:
+                continue  # Released between our insert and the read
+            if as_utc(record.expires_at) > now:
+                return record
+            # Take the key over; a concurrent taker just loses the next insert
+            await IdempotencyKey.filter(id=record.id).delete()
+
+    async def _store(self, user_id: int, key: str, status_code: int, response):
+        await IdempotencyKey.filter(user_id=user_id, key=key).update(
+            status_code=status_code,
+            response=jsonable_encoder(response)
+        )
+        self.executed += 1
+
+    async def _release(self, user_id: int, key: str):
+        await IdempotencyKey.filter(user_id=user_id, key=key, status_code=None).delete()
+
+    async def _wait_for(self, user_id: int, key: str, deadline: float):
+        future = self._in_flight.get((user_id, key))
+        if future is None:
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=max(deadline - monotonic(), 0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _purge(self, now: datetime):
+        if monotonic() - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = monotonic()
+        await IdempotencyKey.filter(expires_at__lte=now).delete()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "duplicates": self.duplicates,
+        }
+
+
+idempotency_store = IdempotencyStore(ttl=IDEMPOTENCY_TTL_SECONDS, wait=IDEMPOTENCY_WAIT_SECONDS)
@@ -0,0 +1,165 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from app.models.appointment import Appointment
+from app.models.doctor import Doctor
+from app.utils.booking import ACTIVE_STATUSES, as_utc, max_concurrency
+
+
+class DoctorIntervals:
+    """Active appointments of one doctor ending after `horizon`, sorted by start"""
+
+    def __init__(self, horizon: datetime, capacity: int, rows):
+        self.horizon = horizon
+        self.capacity = capacity
+        self.entries = sorted((start, end, appointment_id) for appointment_id, start, end in rows)
+        self.max_length = max((end - start for start, end, _ in self.entries), default=timedelta(0))
+
+    def add(self, appointment_id: int, start: datetime, end: datetime):
+        if end <= self.horizon:
+            return
+        insort(self.entries, (start, end, appointment_id))
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, appointment_id: int):
+        self.entries = [entry for entry in self.entries if entry[2] != appointment_id]
+
+    def overlapping(self, start: datetime, end: datetime):
+        """Entries intersecting [start, end): binary search, then a short backward scan"""
+        hi = bisect_left(self.entries, (end,))
+        found = []
+        for i in range(hi - 1, -1, -1):
+            entry_start, entry_end, _ = self.entries[i]
+            if entry_start + self.max_length <= start:
+                break  # No earlier entry can reach into the window
+            if entry_end > start:
+                found.append(self.entries[i])
+        return found
+
+
+class IntervalIndex:
+    """
+    Per-process index of each doctor's upcoming active appointments.
+
+    A doctor's intervals are loaded on first use and then kept current by
+    apply() for changes made in this process; changes made by other workers
+    arrive as notifications and simply drop the doctor, who is reloaded on
+    the next lookup. Both bump the doctor's generation, and a load that
+    overlapped a bump is used once but not kept, since its rows may predate
+    the change. The index only answers for windows starting after the
+    load horizon and is a pre-check: the exclusion constraint in the database
+    still decides every write. The doctor's capacity is loaded alongside, so
+    a capacity change has to invalidate the doctor as well.
+    """
+
+    def __init__(self):
+        self._doctors: dict[int, DoctorIntervals] = {}
+        # Bumped by every change and invalidation; clear() bumps the epoch
+        self._generations: dict[int, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.loads = 0
+        self.fallbacks = 0
+        self.discarded = 0
+
+    async def _doctor(self, doctor_id: int) -> DoctorIntervals:
+        intervals = self._doctors.get(doctor_id)
+        if intervals is None:
+            generation = (self._epoch, self._generations.get(doctor_id, 0))
+            horizon = datetime.now(timezone.utc)
+            capacity = await Doctor.filter(id=doctor_id).values_list("capacity", flat=True)
+            rows = await Appointment.filter(
+                doctor_id=doctor_id,
+                status__in=ACTIVE_STATUSES,
+                end_time__gt=horizon
+            ).values_list("id", "start_time", "end_time")
+            intervals = DoctorIntervals(
+                horizon,
+                capacity[0] if capacity else 1,
+                [(i, as_utc(s), as_utc(e)) for i, s, e in rows]
+            )
+            self.loads += 1
+            if generation != (self._epoch, self._generations.get(doctor_id, 0)):
+                self.discarded += 1
+                return intervals
+            # A concurrent lookup may have loaded the doctor meanwhile
+            intervals = self._doctors.setdefault(doctor_id, intervals)
+        return intervals
+
+    async def overlapping(self, doctor_id: int, start: datetime, end: datetime) -> Optional[list]:
+        """(start, end, id) entries overlapping the window, or None if the window is not covered"""
+        start, end = as_utc(start), as_utc(end)
+        if start < datetime.now(timezone.utc):
+            return None
+        intervals = await self._doctor(doctor_id)
+        if start < intervals.horizon:
+            return None
+        self.hits += 1
+        return intervals.overlapping(start, end)
+
+    async def capacity(self, doctor_id: int) -> int:
+        return (await self._doctor(doctor_id)).capacity
+
+    def apply(self, appointment: dict):
+        """Reflect an appointment's current state (see appointment_events.snapshot)"""
+        self._bump(appointment["doctor_id"])
+        intervals = self._doctors.get(appointment["doctor_id"])
+        if intervals is None:
+            return  # Not loaded; the next lookup reads the database anyway
+        intervals.remove(appointment["id"])
+        if appointment["status"] in ACTIVE_STATUSES:
+            intervals.add(appointment["id"], as_utc(appointment["start_time"]), as_utc(appointment["end_time"]))
+
+    def invalidate(self, doctor_id: int):
+        self._bump(doctor_id)
+        self._doctors.pop(doctor_id, None)
+
+    def clear(self):
+        self._epoch += 1
+        self._doctors.clear()
+
+    def _bump(self, doctor_id: int):
+        self._generations[doctor_id] = self._generations.get(doctor_id, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            "doctors": len(self._doctors),
+            "intervals": sum(len(d.entries) for d in self._doctors.values()),
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "loads": self.loads,
+            "discarded": self.discarded,
+        }
+
+
+interval_index = IntervalIndex()
+
+
+async def has_conflict(doctor_id: int, start: datetime, end: datetime, exclude_id: int = None, extra=()) -> bool:
+    """
+    True if the doctor has no seat free for the whole of [start, end).
+
+    Overlapping appointments come from the index, or from the database
+    outside its horizon, and `extra` (start, end) pairs such as slot holds
+    count too; the window is full when their peak concurrency inside it
+    reaches the doctor's capacity.
+    """
+    start, end = as_utc(start), as_utc(end)
+    found = await interval_index.overlapping(doctor_id, start, end)
+    if found is None:
+        interval_index.fallbacks += 1
+        queryset = Appointment.filter(
+            doctor_id=doctor_id,
+            start_time__lt=end,
+            end_time__gt=start,
+            status__in=ACTIVE_STATUSES
+        )
+        found = [
+            (as_utc(s), as_utc(e), appointment_id)
+            for appointment_id, s, e in await queryset.values_list("id", "start_time", "end_time")
+        ]
+    busy = [(s, e) for s, e, appointment_id in found if appointment_id != exclude_id]
+    busy += list(extra)
+    if not busy:
+        return False
+    return max_concurrency(busy, start, end) >= await interval_index.capacity(doctor_id)
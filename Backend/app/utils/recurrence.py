@@ -0,0 +1,44 @@
+import calendar
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+MAX_SERIES_OCCURRENCES = 52
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Same day and time `months` later, clamped to the end of shorter months"""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+def expand_recurrence(
+    start: datetime,
+    end: datetime,
+    frequency: str,
+    interval: int = 1,
+    count: Optional[int] = None,
+    until: Optional[datetime] = None,
+    limit: int = MAX_SERIES_OCCURRENCES
+) -> Iterator[tuple[datetime, datetime]]:
+    """
+    Lazily yield (start, end) occurrences of a recurrence rule.
+
+    Each occurrence is computed from the first one rather than the previous,
+    so monthly series starting on the 31st don't drift after short months.
+    Stops at `count`, at the first occurrence starting after `until`, or at
+    `limit`, whichever comes first.
+    """
+    duration = end - start
+    step = 0
+    while step < limit and (count is None or step < count):
+        if frequency == "monthly":
+            occurrence = add_months(start, step * interval)
+        elif frequency == "weekly":
+            occurrence = start + timedelta(weeks=step * interval)
+        else:
+            occurrence = start + timedelta(days=step * interval)
+        if until is not None and occurrence > until:
+            return
+        yield occurrence, occurrence + duration
+        step += 1
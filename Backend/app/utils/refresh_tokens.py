@@ -0,0 +1,69 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.utils.user_cache import user_cache
+from app.core.config import REFRESH_TOKEN_EXPIRE_DAYS
+import logging
+
+logger = logging.getLogger(__name__)
+
+invalid_refresh_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Invalid refresh token",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def hash_refresh_token(token: str) -> str:
+    # Tokens are 256 random bits, so a fast hash is enough to keep the
+    # database copy useless to an attacker; no bcrypt on the refresh path.
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def issue_refresh_token(user: User, family_id: uuid.UUID = None) -> str:
+    """Create a refresh token, starting a new rotation family unless one is given"""
+    token = secrets.token_urlsafe(32)
+    await RefreshToken.create(
+        user_id=user.id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4(),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return token
+
+async def rotate_refresh_token(token: str) -> tuple[User, str]:
+    """
+    Exchange a refresh token for its successor in the same family.
+
+    Each token can be used exactly once. Presenting a token that was already
+    rotated means it leaked (or a client replayed it), so the whole family is
+    revoked and the legitimate holder has to log in again.
+    """
+    record = await RefreshToken.get_or_none(token_hash=hash_refresh_token(token))
+    if record is None:
+        raise invalid_refresh_exception
+
+    # Claim the token atomically so two concurrent refreshes cannot both win
+    claimed = 0
+    if not record.revoked:
+        claimed = await RefreshToken.filter(
+            id=record.id,
+            revoked=False,
+            expires_at__gt=datetime.now(timezone.utc)
+        ).update(revoked=True)
+    if not claimed:
+        if record.revoked:
+            logger.warning(f"Refresh token reuse detected for user {record.user_id}")
+        await RefreshToken.filter(family_id=record.family_id).update(revoked=True)
+        raise invalid_refresh_exception
+
+    user = await user_cache.get_user(record.user_id)
+    if user is None or user.disabled:
+        raise invalid_refresh_exception
+
+    return user, await issue_refresh_token(user, family_id=record.family_id)
+
+async def revoke_refresh_tokens(user_id: int):
+    await RefreshToken.filter(user_id=user_id, revoked=False).update(revoked=True)
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import math
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from tortoise import Tortoise
+from tortoise.expressions import Q
+from app.models.appointment import Appointment
+from app.utils.booking import ACTIVE_STATUSES, as_utc
+from app.utils.timing_wheel import TimingWheel
+from app.core.config import (
+    REMINDER_LEAD_MINUTES, REMINDER_TICK_SECONDS, REMINDER_LOAD_AHEAD_MINUTES, REMINDER_CATCHUP_MINUTES,
+    REMINDER_NOTIFIER, REMINDER_FILE
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Due reminders re-read and claimed per round trip
+SEND_BATCH = 500
+
+# Record due reminders as sent; only the rows this call inserted come back,
+# so a reminder another worker (or an earlier run) claimed is skipped
+CLAIM_REMINDERS_SQL = """
+INSERT INTO appointment_reminders (appointment_id, lead_minutes, start_time)
+SELECT * FROM unnest($1::int[], $2::int[], $3::timestamptz[])
+ON CONFLICT DO NOTHING
+RETURNING appointment_id, lead_minutes
+"""
+
+
+@dataclass
+class Reminder:
+    appointment_id: int
+    patient_id: int
+    doctor_id: int
+    start_time: datetime
+    lead_minutes: int
+    patient_email: Optional[str]
+    patient_phone: Optional[str]
+
+
+class LogNotifier:
+    """Stand-in notifier writing reminders to the application log"""
+
+    async def send(self, reminder: Reminder):
+        logger.info(
+            f"Reminder for appointment {reminder.appointment_id}: patient {reminder.patient_id} "
+            f"sees doctor {reminder.doctor_id} at {reminder.start_time.isoformat()}"
+        )
+
+
+class FileNotifier:
+    """Stand-in notifier appending reminders to a file as JSON lines"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def send(self, reminder: Reminder):
+        line = json.dumps(asdict(reminder), default=str) + "\n"
+        await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+# Notifiers selectable with REMINDER_NOTIFIER. A real channel (email, SMS)
+# is any object with an async send(reminder) method.
+NOTIFIERS = {
+    "log": LogNotifier,
+    "file": lambda: FileNotifier(REMINDER_FILE),
+}
+
+
+class ReminderScheduler:
+    """
+    Sends a reminder `leads` minutes before each scheduled appointment.
+
+    Pending reminders wait in a hierarchical timing wheel, so a tick costs
+    O(1) however many are pending and nothing polls the appointments table.
+    The wheel is filled incrementally: when fewer than half of `load_ahead`
+    remain loaded, one range query on start_time reads the reminders due up
+    to `load_ahead` from now. Appointments booked, moved or cancelled in
+    this process update the wheel directly (apply()). Changes made by other
+    workers are caught at send time instead: due reminders are re-read in a
+    batch and those whose appointment is gone, moved or already started
+    are dropped.
+
+    Each due reminder is claimed in the appointment_reminders log before it
+    is sent, and only a successful claim sends, so several workers and
+    restarts never send one twice; a send that fails after its claim is
+    logged, not retried. On start, loading begins `catchup` in the past,
+    so reminders that fell due while the process was down still go out.
+    """
+
+    def __init__(self, notifier, leads: list[int], tick: timedelta, load_ahead: timedelta, catchup: timedelta):
+        self.notifier = notifier
+        self.leads = leads
+        self.tick = tick
+        self.load_ahead = load_ahead
+        self.catchup = catchup
+        self._wheel: Optional[TimingWheel] = None
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_until: Optional[datetime] = None
+        self.loads = 0
+        self.sent = 0
+        self.stale = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors = 0
+
+    def _tick_of(self, moment: datetime, round_up: bool = False) -> int:
+        ticks = as_utc(moment).timestamp() / self.tick.total_seconds()
+        return math.ceil(ticks) if round_up else math.floor(ticks)
+
+    def start(self):
+        if self._task is None:
+            now = datetime.now(timezone.utc)
+            self._wheel = TimingWheel(self._tick_of(now))
+            self.loaded_until = now - self.catchup
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wheel = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.exception("Reminder tick failed")
+            await asyncio.sleep(self.tick.total_seconds())
+
+    async def run_once(self):
+        now = datetime.now(timezone.utc)
+        if self.loaded_until - now < self.load_ahead / 2:
+            await self._load(now + self.load_ahead)
+        due = self._wheel.advance(self._tick_of(now))
+        for i in range(0, len(due), SEND_BATCH):
+            await self._send([value for _, _, value in due[i:i + SEND_BATCH]])
+
+    def _schedule(self, appointment_id: int, start_time: datetime, window_start: datetime, window_end: datetime):
+        """Put the appointment's reminders falling due in [window_start, window_end) on the wheel"""
+        for lead in self.leads:
+            due_at = start_time - timedelta(minutes=lead)
+            if window_start <= due_at < window_end:
+                self._wheel.add(
+                    (appointment_id, lead),
+                    self._tick_of(due_at, round_up=True),
+                    (appointment_id, lead, start_time)
+                )
+
+    async def _load(self, until: datetime):
+        window_start = self.loaded_until
+        # Advanced before the query, so apply() covers changes made while it runs
+        self.loaded_until = until
+        try:
+            rows = await Appointment.filter(
+                Q(
+                    *[
+                        Q(start_time__gte=window_start + timedelta(minutes=lead),
+                          start_time__lt=until + timedelta(minutes=lead))
+                        for lead in self.leads
+                    ],
+                    join_type="OR"
+                ),
+                status__in=ACTIVE_STATUSES
+            ).values_list("id", "start_time")
+        except BaseException:
+            self.loaded_until = window_start
+            raise
+        for appointment_id, start_time in rows:
+            self._schedule(appointment_id, as_utc(start_time), window_start, until)
+        self.loads += 1
+
+    def apply(self, appointment: dict):
+        """Reflect an appointment's current state (see appointment_events.snapshot)"""
+        if self._wheel is None:
+            return
+        for lead in self.leads:
+            self._wheel.remove((appointment["id"], lead))
+        if appointment["status"] in ACTIVE_STATUSES:
+            # Reminders already past when the change is made are skipped;
+            # ones beyond the loaded window are read when it gets there
+            self._schedule(
+                appointment["id"], as_utc(appointment["start_time"]),
+                datetime.now(timezone.utc), self.loaded_until
+            )
+
+    async def _send(self, due):
+        now = datetime.now(timezone.utc)
+        current = {
+            row["id"]: row
+            for row in await Appointment.filter(
+                id__in={appointment_id for appointment_id, _, _ in due},
+                status__in=ACTIVE_STATUSES,
+                start_time__gt=now
+            ).values("id", "patient_id", "doctor_id", "start_time", "patient__phone", "patient__user__email")
+        }
+        fresh = [
+            (appointment_id, lead, start_time)
+            for appointment_id, lead, start_time in due
+            if appointment_id in current and as_utc(current[appointment_id]["start_time"]) == start_time
+        ]
+        self.stale += len(due) - len(fresh)
+        if not fresh:
+            return
+
+        claimed = await Tortoise.get_connection("default").execute_query_dict(CLAIM_REMINDERS_SQL, [
+            [appointment_id for appointment_id, _, _ in fresh],
+            [lead for _, lead, _ in fresh],
+            [start_time for _, _, start_time in fresh],
+        ])
+        claimed = {(row["appointment_id"], row["lead_minutes"]) for row in claimed}
+        self.duplicates += len(fresh) - len(claimed)
+
+        for appointment_id, lead, start_time in fresh:
+            if (appointment_id, lead) not in claimed:
+                continue
+            row = current[appointment_id]
+            try:
+                await self.notifier.send(Reminder(
+                    appointment_id=appointment_id,
+                    patient_id=row["patient_id"],
+                    doctor_id=row["doctor_id"],
+                    start_time=start_time,
+                    lead_minutes=lead,
+                    patient_email=row["patient__user__email"],
+                    patient_phone=row["patient__phone"]
+                ))
+                self.sent += 1
+            except Exception:
+                self.failed += 1
+                logger.exception(f"Sending reminder for appointment {appointment_id} failed")
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "pending": len(self._wheel) if self._wheel is not None else 0,
+            "loaded_until": self.loaded_until,
+            "loads": self.loads,
+            "sent": self.sent,
+            "stale": self.stale,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+reminder_scheduler = ReminderScheduler(
+    notifier=NOTIFIERS[REMINDER_NOTIFIER](),
+    leads=REMINDER_LEAD_MINUTES,
+    tick=timedelta(seconds=REMINDER_TICK_SECONDS),
+    load_ahead=timedelta(minutes=REMINDER_LOAD_AHEAD_MINUTES),
+    catchup=timedelta(minutes=REMINDER_CATCHUP_MINUTES),
+)
@@ -0,0 +1,83 @@
+import asyncio
+from time import monotonic
+from tortoise.expressions import Q
+from tortoise.signals import post_save, post_delete
+from app.models.user import User
+from app.core.config import REVOCATION_SYNC_SECONDS
+
+
+class RevocationList:
+    """
+    Compact in-memory view of which tokens must no longer be accepted.
+
+    Only users that are disabled or have bumped their token_version are
+    tracked, so the sync query and the memory footprint stay proportional to
+    the number of revocations rather than the number of users. The list is
+    re-synced from the database at most every `sync_interval` seconds, which
+    bounds how long a revoked token stays usable on other workers.
+    """
+
+    def __init__(self, sync_interval: float):
+        self.sync_interval = sync_interval
+        self._min_version: dict[int, int] = {}
+        self._disabled: set[int] = set()
+        self._synced_at = None
+        self._lock = asyncio.Lock()
+        self.syncs = 0
+
+    async def refresh_if_stale(self):
+        if self._synced_at is not None and monotonic() - self._synced_at < self.sync_interval:
+            return
+        async with self._lock:
+            # Another request may have synced while we waited for the lock
+            if self._synced_at is not None and monotonic() - self._synced_at < self.sync_interval:
+                return
+            await self.sync()
+
+    async def sync(self):
+        rows = await User.filter(
+            Q(disabled=True) | Q(token_version__gt=0)
+        ).values_list("id", "token_version", "disabled")
+        self._min_version = {user_id: version for user_id, version, _ in rows if version}
+        self._disabled = {user_id for user_id, _, disabled in rows if disabled}
+        self._synced_at = monotonic()
+        self.syncs += 1
+
+    def update(self, user_id: int, token_version: int, disabled: bool):
+        """Apply a change made in this process without waiting for the next sync"""
+        if token_version:
+            self._min_version[user_id] = token_version
+        else:
+            self._min_version.pop(user_id, None)
+        if disabled:
+            self._disabled.add(user_id)
+        else:
+            self._disabled.discard(user_id)
+
+    def is_revoked(self, user_id: int, token_version: int) -> bool:
+        if user_id in self._disabled:
+            return True
+        return token_version < self._min_version.get(user_id, 0)
+
+    def stats(self) -> dict:
+        return {
+            "disabled_users": len(self._disabled),
+            "versioned_users": len(self._min_version),
+            "sync_interval_seconds": self.sync_interval,
+            "syncs": self.syncs,
+        }
+
+
+revocation_list = RevocationList(sync_interval=REVOCATION_SYNC_SECONDS)
+
+
+@post_save(User)
+async def _track_user_revocation(sender, instance, created, using_db, update_fields):
+    revocation_list.update(instance.id, instance.token_version, instance.disabled)
+
+
+# Deleted users are only covered until the next sync drops them from the
+# list; disable a user before deleting it to revoke its tokens everywhere.
+@post_delete(User)
+async def _revoke_deleted_user(sender, instance, using_db):
+    revocation_list.update(instance.id, instance.token_version, True)
@@ -0,0 +1,173 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from time import monotonic
+from typing import Optional
+from zoneinfo import ZoneInfo
+from app.models.schedule import DoctorSchedule, ScheduleException
+from app.utils.booking import merge_intervals, subtract_interval
+from app.utils.db_events import db_events
+from app.core.config import CLINIC_TIMEZONE, SCHEDULE_CACHE_TTL_SECONDS
+
+
+class DoctorRules:
+    """A doctor's schedule template plus the per-day calendars derived from it"""
+
+    def __init__(self, weekly: dict, exceptions: dict, loaded_at: float):
+        self.weekly = weekly  # weekday -> [(time, time)]
+        self.exceptions = exceptions  # date -> [ScheduleException values]
+        self.loaded_at = loaded_at
+        self.days: dict[date, Optional[list]] = {}
+
+
+class ScheduleCache:
+    """
+    Effective working hours per doctor and day.
+
+    The weekly template and exceptions of a doctor are loaded once and every
+    day's calendar is computed on first use and kept, so booking validation
+    and availability queries are dictionary lookups. Edits invalidate the
+    doctor on every worker through schedule_changed(); rules are also
+    reloaded after `ttl` seconds as a backstop for missed notifications.
+
+    A doctor without any weekly hours has no template, which means no
+    restriction: day calendars are None rather than empty.
+    """
+
+    def __init__(self, tz: str, ttl: float):
+        self.tz = ZoneInfo(tz)
+        self.ttl = ttl
+        self._doctors: dict[int, DoctorRules] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _fresh(self, doctor_id: int) -> bool:
+        rules = self._doctors.get(doctor_id)
+        return rules is not None and monotonic() - rules.loaded_at < self.ttl
+
+    async def load(self, doctor_ids):
+        """Load rules for every doctor not already cached, in two queries"""
+        stale = [doctor_id for doctor_id in set(doctor_ids) if not self._fresh(doctor_id)]
+        if not stale:
+            return
+        weekly = defaultdict(lambda: defaultdict(list))
+        for doctor_id, weekday, start, end in await DoctorSchedule.filter(
+            doctor_id__in=stale
+        ).values_list("doctor_id", "weekday", "start_time", "end_time"):
+            weekly[doctor_id][weekday].append((_clock(start), _clock(end)))
+
+        exceptions = defaultdict(lambda: defaultdict(list))
+        for row in await ScheduleException.filter(doctor_id__in=stale).values(
+            "doctor_id", "date", "start_time", "end_time", "is_available"
+        ):
+            exceptions[row["doctor_id"]][row["date"]].append(row)
+
+        now = monotonic()
+        for doctor_id in stale:
+            self._doctors[doctor_id] = DoctorRules(
+                dict(weekly.get(doctor_id, {})), dict(exceptions.get(doctor_id, {})), now
+            )
+        self.loads += 1
+
+    def invalidate(self, doctor_id: int):
+        self._doctors.pop(doctor_id, None)
+
+    def clear(self):
+        self._doctors.clear()
+
+    def day(self, doctor_id: int, day: date) -> Optional[list]:
+        """Working intervals (UTC datetimes) for a local date; rules must be loaded"""
+        rules = self._doctors[doctor_id]
+        if day in rules.days:
+            self.hits += 1
+            return rules.days[day]
+        self.misses += 1
+        rules.days[day] = self._compute_day(rules, day)
+        return rules.days[day]
+
+    def _compute_day(self, rules: DoctorRules, day: date) -> Optional[list]:
+        if not rules.weekly:
+            return None
+        intervals = merge_intervals(
+            (self._at(day, start), self._at(day, end))
+            for start, end in rules.weekly.get(day.weekday(), [])
+        )
+        exceptions = rules.exceptions.get(day, [])
+        for exc in exceptions:
+            if exc["is_available"]:
+                continue
+            if exc["start_time"] is None:
+                intervals = []
+            else:
+                intervals = subtract_interval(
+                    intervals, self._at(day, exc["start_time"]), self._at(day, exc["end_time"])
+                )
+        extra = [
+            (self._at(day, exc["start_time"]), self._at(day, exc["end_time"]))
+            for exc in exceptions
+            if exc["is_available"] and exc["start_time"] is not None
+        ]
+        return merge_intervals(intervals + extra) if extra else intervals
+
+    def _at(self, day: date, clock: time) -> datetime:
+        return datetime.combine(day, _clock(clock), tzinfo=self.tz).astimezone(timezone.utc)
+
+    async def working_intervals(self, doctor_id: int, window_start: datetime, window_end: datetime) -> Optional[list]:
+        """Working intervals clipped to the window, or None if the doctor has no template"""
+        await self.load([doctor_id])
+        return self.cached_working_intervals(doctor_id, window_start, window_end)
+
+    def cached_working_intervals(self, doctor_id: int, window_start: datetime, window_end: datetime) -> Optional[list]:
+        if not self._doctors[doctor_id].weekly:
+            return None
+        day = window_start.astimezone(self.tz).date()
+        last = window_end.astimezone(self.tz).date()
+        intervals = []
+        while day <= last:
+            for start, end in self.day(doctor_id, day):
+                start, end = max(start, window_start), min(end, window_end)
+                if start < end:
+                    intervals.append((start, end))
+            day += timedelta(days=1)
+        return intervals
+
+    async def is_bookable(self, doctor_id: int, start: datetime, end: datetime) -> bool:
+        """True if [start, end) falls entirely inside one working interval"""
+        intervals = await self.working_intervals(doctor_id, start, end)
+        if intervals is None:
+            return True
+        # Clipped to [start, end), so the slot fits iff one interval covers it all
+        return any(s == start and e == end for s, e in intervals)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "doctors": len(self._doctors),
+            "days": sum(len(rules.days) for rules in self._doctors.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "loads": self.loads,
+        }
+
+
+def _clock(value) -> time:
+    # TIME columns may come back as timedelta or with a tzinfo attached
+    if isinstance(value, timedelta):
+        return (datetime.min + value).time()
+    return value.replace(tzinfo=None)
+
+
+schedule_cache = ScheduleCache(tz=CLINIC_TIMEZONE, ttl=SCHEDULE_CACHE_TTL_SECONDS)
+
+
+# NOTIFY channel telling other workers to drop a doctor's cached rules
+SCHEDULE_CHANNEL = "schedule_changes"
+
+async def schedule_changed(doctor_id: int):
+    """Drop the doctor's cached calendar here and on every other worker"""
+    schedule_cache.invalidate(doctor_id)
+    await db_events.publish(SCHEDULE_CHANNEL, {"doctor_id": doctor_id})
+
+def handle_remote_schedule_change(payload: dict):
+    schedule_cache.invalidate(payload["doctor_id"])
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from app.utils.booking import as_utc
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def from_epoch_micros(values) -> np.ndarray:
+    """datetime64[us] array of UTC epoch microseconds; an int64 array is viewed, not copied"""
+    return np.asarray(values, dtype=np.int64).view("datetime64[us]")
+
+
+def to_datetime64(times) -> np.ndarray:
+    """datetime64[us] array of aware (or naive UTC) datetimes"""
+    return from_epoch_micros([(as_utc(t) - EPOCH) // MICROSECOND for t in times])
+
+
+class SlotGrid:
+    """
+    Fixed-resolution time grid shared by every doctor in a search.
+
+    Column j covers [start + j*resolution, start + (j+1)*resolution). The
+    start is aligned up to the resolution so slots land on round times, and
+    only slots that fit entirely inside the window are included.
+    """
+
+    def __init__(self, window_start: datetime, window_end: datetime, resolution: timedelta):
+        self.resolution = resolution
+        step = resolution.total_seconds()
+        offset = -(window_start - EPOCH).total_seconds() % step
+        self.start = window_start + timedelta(seconds=offset)
+        self.size = max(int((window_end - self.start).total_seconds() // step), 0)
+        self._origin = to_datetime64([self.start])[0]
+        self._step = np.timedelta64(resolution // MICROSECOND, "us")
+
+    def slot_time(self, index: int) -> datetime:
+        return self.start + index * self.resolution
+
+    def to_slots(self, times: np.ndarray, round_up: bool) -> np.ndarray:
+        """Columns of datetime64[us] times, clipped to the grid; exact integer arithmetic"""
+        if round_up:
+            slots = -((self._origin - times) // self._step)
+        else:
+            slots = (times - self._origin) // self._step
+        return np.clip(slots, 0, self.size)
+
+
+def occupancy(grid: SlotGrid, rows: np.ndarray, starts: np.ndarray, ends: np.ndarray, n_rows: int,
+              weights=None) -> np.ndarray:
+    """
+    Per-row booking counts for every grid slot, shape (n_rows, grid.size).
+    `starts` and `ends` are datetime64[us] arrays.
+
+    Intervals are written into a difference array (+weight at the first
+    slot touched, -weight past the last) and integrated with one cumsum, so
+    the cost is linear in intervals plus cells regardless of interval
+    length. A slot that an interval only partially covers counts as
+    occupied. Each interval counts once unless `weights` says otherwise.
+    """
+    diff = np.zeros((n_rows, grid.size + 1), dtype=np.int32)
+    if len(rows):
+        first = grid.to_slots(starts, round_up=False)
+        last = grid.to_slots(ends, round_up=True)
+        weights = np.ones(len(rows), dtype=np.int32) if weights is None else np.asarray(weights, dtype=np.int32)
+        np.add.at(diff, (rows, first), weights)
+        np.add.at(diff, (rows, last), -weights)
+    return np.cumsum(diff[:, :-1], axis=1)
+
+
+def earliest_runs(free: np.ndarray, length: int) -> np.ndarray:
+    """
+    Index of the first run of `length` consecutive free slots in each row,
+    or -1 where a row has none. `free` is a 2-D boolean array.
+    """
+    n_rows, n_slots = free.shape
+    if length > n_slots:
+        return np.full(n_rows, -1, dtype=np.int64)
+    counts = np.zeros((n_rows, n_slots + 1), dtype=np.int32)
+    np.cumsum(free, axis=1, out=counts[:, 1:])
+    window_free = (counts[:, length:] - counts[:, :-length]) == length
+    first = window_free.argmax(axis=1)
+    return np.where(window_free.any(axis=1), first, -1)
@@ -0,0 +1,199 @@
+import heapq
+import uuid
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from tortoise import Tortoise
+from app.utils.db_events import db_events
+from app.core.config import SLOT_HOLD_TTL_SECONDS, SLOT_HOLD_MAX_PER_USER
+
+# NOTIFY channel replicating holds to the other workers
+SLOT_HOLD_CHANNEL = "slot_holds"
+
+# Record a claim unless another worker holds one, pruning expired claims on
+# the way; a row comes back only to the worker that won
+CLAIM_HOLD_SQL = """
+WITH pruned AS (DELETE FROM slot_hold_claims WHERE expires_at < now())
+INSERT INTO slot_hold_claims (hold_id, expires_at) VALUES ($1, $2)
+ON CONFLICT DO NOTHING
+RETURNING hold_id
+"""
+
+
+@dataclass
+class SlotHold:
+    id: str
+    doctor_id: int
+    start_time: datetime
+    end_time: datetime
+    owner_id: int
+    expires_at: datetime
+    converting: bool = False
+
+
+class SlotHoldStore:
+    """
+    Short-lived reservations of (doctor, start, end) intervals.
+
+    Holds are indexed by id and by doctor, and their expiry times sit in a
+    min-heap: each sweep pops only the holds that have expired, never
+    scanning live ones. Released or consumed holds leave stale heap entries
+    behind, which are skipped when they surface (lazy deletion).
+
+    Every worker keeps its own store; creates, releases and conversions are
+    replicated to the others through NOTIFY, so a hold taken on one worker
+    takes its seat everywhere within the notification delay. Holds are also
+    counted per owner, so the per-user limit is checked without a scan.
+    """
+
+    def __init__(self, ttl: float, max_per_user: int):
+        self.ttl = timedelta(seconds=ttl)
+        self.max_per_user = max_per_user
+        self._holds: dict[str, SlotHold] = {}
+        self._by_doctor: dict[int, dict[str, SlotHold]] = {}
+        self._per_owner: dict[int, int] = {}
+        self._expiry: list[tuple[datetime, str]] = []
+        self.created = 0
+        self.expired = 0
+        self.converted = 0
+
+    def sweep(self):
+        now = datetime.now(timezone.utc)
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, hold_id = heapq.heappop(self._expiry)
+            hold = self._holds.get(hold_id)
+            if hold is not None and hold.expires_at == expires_at:
+                self._remove(hold)
+                self.expired += 1
+
+    def _add(self, hold: SlotHold):
+        self._holds[hold.id] = hold
+        self._by_doctor.setdefault(hold.doctor_id, {})[hold.id] = hold
+        self._per_owner[hold.owner_id] = self._per_owner.get(hold.owner_id, 0) + 1
+        heapq.heappush(self._expiry, (hold.expires_at, hold.id))
+
+    def _remove(self, hold: SlotHold):
+        if self._holds.pop(hold.id, None) is None:
+            return
+        held = self._per_owner[hold.owner_id] - 1
+        if held:
+            self._per_owner[hold.owner_id] = held
+        else:
+            del self._per_owner[hold.owner_id]
+        doctor_holds = self._by_doctor.get(hold.doctor_id)
+        if doctor_holds is not None:
+            doctor_holds.pop(hold.id, None)
+            if not doctor_holds:
+                del self._by_doctor[hold.doctor_id]
+
+    def get(self, hold_id: str) -> Optional[SlotHold]:
+        self.sweep()
+        return self._holds.get(hold_id)
+
+    def overlapping(self, doctor_id: int, start: datetime, end: datetime, exclude_id: str = None) -> list[SlotHold]:
+        self.sweep()
+        return [
+            hold for hold in self._by_doctor.get(doctor_id, {}).values()
+            if hold.start_time < end and hold.end_time > start and hold.id != exclude_id
+        ]
+
+    def held_by(self, owner_id: int) -> int:
+        self.sweep()
+        return self._per_owner.get(owner_id, 0)
+
+    def create(self, doctor_id: int, start: datetime, end: datetime, owner_id: int) -> SlotHold:
+        """Reserve the interval; callers then check it against the doctor's capacity"""
+        hold = SlotHold(
+            id=uuid.uuid4().hex,
+            doctor_id=doctor_id,
+            start_time=start,
+            end_time=end,
+            owner_id=owner_id,
+            expires_at=datetime.now(timezone.utc) + self.ttl
+        )
+        self._add(hold)
+        self.created += 1
+        return hold
+
+    async def claim(self, hold_id: str) -> Optional[SlotHold]:
+        """
+        Mark a live hold as being converted into an appointment.
+
+        Other workers' copies of the hold are not marked, so the claim is
+        also recorded in slot_hold_claims, where one worker wins. The hold
+        keeps its seat for everyone else until complete() or abandon(), and
+        a second claim on it fails on any worker, so a hold turns into at
+        most one appointment.
+        """
+        hold = self.get(hold_id)
+        if hold is None or hold.converting:
+            return None
+        hold.converting = True
+        try:
+            claimed = await Tortoise.get_connection("default").execute_query_dict(
+                CLAIM_HOLD_SQL, [hold.id, hold.expires_at]
+            )
+        except BaseException:
+            hold.converting = False
+            raise
+        if not claimed:
+            hold.converting = False
+            return None
+        return hold
+
+    def complete(self, hold: SlotHold):
+        """The claim row stays until expiry, so late copies elsewhere cannot be claimed"""
+        self._remove(hold)
+        self.converted += 1
+
+    async def abandon(self, hold: SlotHold):
+        if hold.id not in self._holds:
+            return  # Completed meanwhile; its claim must stay
+        hold.converting = False
+        await Tortoise.get_connection("default").execute_query(
+            "DELETE FROM slot_hold_claims WHERE hold_id = $1", [hold.id]
+        )
+
+    def release(self, hold: SlotHold):
+        self._remove(hold)
+
+    def apply_remote(self, payload: dict):
+        if payload["action"] == "create":
+            hold = payload["hold"]
+            if hold["id"] in self._holds:
+                return
+            self._add(SlotHold(
+                id=hold["id"],
+                doctor_id=hold["doctor_id"],
+                start_time=datetime.fromisoformat(hold["start_time"]),
+                end_time=datetime.fromisoformat(hold["end_time"]),
+                owner_id=hold["owner_id"],
+                expires_at=datetime.fromisoformat(hold["expires_at"])
+            ))
+        else:
+            hold = self._holds.get(payload["hold_id"])
+            if hold is not None:
+                self._remove(hold)
+
+    def stats(self) -> dict:
+        self.sweep()
+        return {
+            "active": len(self._holds),
+            "heap_entries": len(self._expiry),
+            "ttl_seconds": self.ttl.total_seconds(),
+            "created": self.created,
+            "expired": self.expired,
+            "converted": self.converted,
+        }
+
+
+slot_holds = SlotHoldStore(ttl=SLOT_HOLD_TTL_SECONDS, max_per_user=SLOT_HOLD_MAX_PER_USER)
+
+
+async def publish_hold_created(hold: SlotHold):
+    hold_data = asdict(hold)
+    del hold_data["converting"]
+    await db_events.publish(SLOT_HOLD_CHANNEL, {"action": "create", "hold": hold_data})
+
+async def publish_hold_removed(hold_id: str):
+    await db_events.publish(SLOT_HOLD_CHANNEL, {"action": "remove", "hold_id": hold_id})
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from tortoise import Tortoise
+from app.utils.appointment_events import appointments_changed, snapshot
+from app.utils.booking import as_utc
+from app.core.config import SWEEPER_INTERVAL_SECONDS, SWEEPER_BATCH_SIZE, SWEEPER_GRACE_MINUTES
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One bounded batch: lock up to $2 past-due rows (skipping rows another
+# worker or request holds), then close them with a single set-based update
+SWEEP_BATCH_SQL = """
+UPDATE appointments AS a
+SET status = CASE
+    WHEN EXISTS (SELECT 1 FROM medical_records AS m WHERE m.appointment_id = a.id) THEN 'completed'
+    ELSE 'no_show'
+END
+FROM (
+    SELECT id FROM appointments
+    WHERE status = 'scheduled' AND end_time < $1
+    ORDER BY end_time
+    LIMIT $2
+    FOR UPDATE SKIP LOCKED
+) AS due
+WHERE a.id = due.id
+RETURNING a.id, a.doctor_id, a.patient_id, a.start_time, a.end_time, a.status
+"""
+
+OLDEST_DUE_SQL = "SELECT MIN(end_time) AS oldest FROM appointments WHERE status = 'scheduled' AND end_time < $1"
+
+
+class AppointmentSweeper:
+    """
+    Background task closing out appointments that were never updated.
+
+    Every `interval` seconds, scheduled appointments that ended more than
+    `grace` ago become `completed` if a medical record was written for them
+    and `no_show` otherwise. Work is done in batches of at most
+    `batch_size` rows, each one short UPDATE; SKIP LOCKED lets several
+    workers sweep at once without blocking each other or live requests.
+    """
+
+    def __init__(self, interval: float, batch_size: int, grace: timedelta):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.grace = grace
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.batches = 0
+        self.completed = 0
+        self.no_shows = 0
+        self.errors = 0
+        self.last_run_at: Optional[datetime] = None
+        self.oldest_due: Optional[datetime] = None  # Backlog left after the last run
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.exception("Appointment sweep failed")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        """Sweep batches until no past-due appointment is left; returns the rows closed"""
+        connection = Tortoise.get_connection("default")
+        cutoff = datetime.now(timezone.utc) - self.grace
+        swept = 0
+        while True:
+            rows = await connection.execute_query_dict(SWEEP_BATCH_SQL, [cutoff, self.batch_size])
+            self.batches += 1
+            swept += len(rows)
+            for row in rows:
+                if row["status"] == "completed":
+                    self.completed += 1
+                else:
+                    self.no_shows += 1
+            await appointments_changed([
+                ({**snapshot(row), "status": "scheduled"}, snapshot(row)) for row in rows
+            ])
+            if len(rows) < self.batch_size:
+                break
+            await asyncio.sleep(0)  # Let requests in between batches
+
+        oldest = await connection.execute_query_dict(OLDEST_DUE_SQL, [cutoff])
+        self.oldest_due = oldest[0]["oldest"] if oldest else None
+        self.last_run_at = datetime.now(timezone.utc)
+        self.runs += 1
+        if swept:
+            logger.info(f"Swept {swept} past-due appointments")
+        return swept
+
+    def stats(self) -> dict:
+        now = datetime.now(timezone.utc)
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "batches": self.batches,
+            "completed": self.completed,
+            "no_shows": self.no_shows,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+            "seconds_since_last_run": round((now - self.last_run_at).total_seconds(), 1) if self.last_run_at else None,
+            # How far behind the sweep is: age of the oldest appointment it could not close yet
+            "lag_seconds": round((now - self.grace - as_utc(self.oldest_due)).total_seconds(), 1) if self.oldest_due else 0.0,
+        }
+
+
+appointment_sweeper = AppointmentSweeper(
+    interval=SWEEPER_INTERVAL_SECONDS,
+    batch_size=SWEEPER_BATCH_SIZE,
+    grace=timedelta(minutes=SWEEPER_GRACE_MINUTES),
+)
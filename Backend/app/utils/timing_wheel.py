@@ -0,0 +1,78 @@
+from typing import Hashable
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel over integer ticks.
+
+    Level k has `slots` buckets, each covering slots**k ticks. An entry
+    goes into the lowest level whose range reaches its due tick; when the
+    current tick enters a new block of a level, that level's bucket for the
+    block is emptied into the levels below (cascading), so every entry
+    moves down at most `levels` times before it fires. Adding and removing
+    are O(1) and advancing one tick is O(1) plus the entries it touches,
+    however many entries are pending.
+
+    Entries are keyed, so re-adding a key replaces its previous entry.
+    """
+
+    def __init__(self, current: int, slots: int = 64, levels: int = 4):
+        self.current = current
+        self.slots = slots
+        self.levels = levels
+        self.span = slots ** levels  # Furthest tick ahead an entry may be due
+        self._buckets = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._where: dict[Hashable, dict] = {}  # Key -> bucket holding it
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def add(self, key: Hashable, due: int, value=None):
+        """Schedule `value` for tick `due`; entries already due fire on the next tick"""
+        self.remove(key)
+        self._place(key, max(due, self.current + 1), value)
+
+    def remove(self, key: Hashable) -> bool:
+        bucket = self._where.pop(key, None)
+        if bucket is None:
+            return False
+        del bucket[key]
+        return True
+
+    def _place(self, key, due: int, value):
+        delta = due - self.current
+        if delta >= self.span:
+            raise ValueError(f"Due tick {due} is beyond the wheel's span")
+        level, width = 0, 1
+        while delta >= width * self.slots:
+            level += 1
+            width *= self.slots
+        bucket = self._buckets[level][(due // width) % self.slots]
+        bucket[key] = (due, value)
+        self._where[key] = bucket
+
+    def advance(self, until: int) -> list:
+        """Move to tick `until`, returning the (key, due, value) entries that fell due"""
+        fired = []
+        while self.current < until:
+            self.current += 1
+            # Cascade every level whose block starts at this tick, top down
+            width = self.slots ** (self.levels - 1)
+            for level in range(self.levels - 1, 0, -1):
+                if self.current % width == 0:
+                    bucket = self._buckets[level][(self.current // width) % self.slots]
+                    entries = list(bucket.items())
+                    bucket.clear()
+                    for key, (due, value) in entries:
+                        del self._where[key]
+                        self._place(key, due, value)
+                width //= self.slots
+            bucket = self._buckets[0][self.current % self.slots]
+            for key, (due, value) in bucket.items():
+                del self._where[key]
+                fired.append((key, due, value))
+            bucket.clear()
+        return fired
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Optional
+from tortoise.signals import post_save, post_delete
+from app.models.user import User
+from app.core.config import USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE
+
+
+class UserCache:
+    """
+    Per-process LRU cache of User rows keyed by user_id.
+
+    Entries expire after `ttl` seconds so changes made by other workers are
+    picked up within a bounded delay; changes made through this process are
+    invalidated immediately.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, tuple[float, User]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> Optional[User]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at <= monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def set(self, user: User):
+        self._entries[user.id] = (monotonic() + self.ttl, user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int):
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        """Return the user from the cache, loading it from the database on a miss"""
+        user = self.get(user_id)
+        if user is None:
+            user = await User.get_or_none(id=user_id)
+            if user is not None:
+                self.set(user)
+        return user
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache(ttl=USER_CACHE_TTL_SECONDS, max_size=USER_CACHE_MAX_SIZE)
+
+
+# Model saves and deletes (update, disable, delete) drop the cached row.
+# Queryset-level User.filter(...).update()/.delete() bypass these signals and
+# must call user_cache.invalidate() themselves.
+@post_save(User)
+async def _invalidate_on_save(sender, instance, created, using_db, update_fields):
+    user_cache.invalidate(instance.id)
+
+
+@post_delete(User)
+async def _invalidate_on_delete(sender, instance, using_db):
+    user_cache.invalidate(instance.id)
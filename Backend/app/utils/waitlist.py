@@ -0,0 +1,139 @@
+from datetime import datetime, timezone
+from typing import Optional
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+from app.models.appointment import Appointment
+from app.models.doctor import Doctor
+from app.models.waitlist import WaitlistEntry
+from app.utils.booking import ACTIVE_STATUSES, as_utc, is_overlap_violation
+from app.utils.interval_index import has_conflict
+from app.utils.schedule import schedule_cache
+from app.utils.slot_holds import slot_holds
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Waiting entries fetched per freed slot. Later ones are only tried when
+# earlier ones cannot take the slot (claimed concurrently, or the patient
+# is busy at that time).
+MATCH_CANDIDATES = 10
+
+
+def frees_slot(before: Optional[dict], after: dict) -> bool:
+    """True if a change releases an upcoming slot (see appointment_events.snapshot)"""
+    if before is None or before["status"] not in ACTIVE_STATUSES:
+        return False
+    if as_utc(before["start_time"]) <= datetime.now(timezone.utc):
+        return False
+    return (
+        after["status"] not in ACTIVE_STATUSES
+        or after["doctor_id"] != before["doctor_id"]
+        or as_utc(after["start_time"]) != as_utc(before["start_time"])
+        or as_utc(after["end_time"]) != as_utc(before["end_time"])
+    )
+
+
+class WaitlistMatcher:
+    """
+    Offers freed slots to waiting patients and books the first taker.
+
+    Candidates for a slot are the waiting entries for its doctor, or for any
+    doctor of the same specialization in any letter case, whose window
+    contains the slot; the partial indexes on (doctor_id | upper-cased
+    specialization, window) make that one index scan. Entries are served
+    first come, first served. Each claim locks the entry with SKIP LOCKED
+    and books in the same transaction, so an entry is converted at most
+    once even with several workers matching, and the exclusion constraint
+    still rejects a slot someone rebooked first.
+    """
+
+    def __init__(self, candidates: int):
+        self.candidates = candidates
+        self.offered = 0
+        self.booked = 0
+        self.failed = 0
+
+    async def backfill(self, changes) -> list[Appointment]:
+        """
+        Offer every slot freed by `changes` to the waitlist; returns the
+        bookings made. A failed offer is logged and the next slot tried.
+        """
+        booked = []
+        for before, after in changes:
+            if not frees_slot(before, after):
+                continue
+            try:
+                appointment = await self.offer(
+                    before["doctor_id"], as_utc(before["start_time"]), as_utc(before["end_time"])
+                )
+            except Exception:
+                self.failed += 1
+                logger.exception(f"Waitlist offer for appointment {before['id']}'s slot failed")
+                continue
+            if appointment is not None:
+                booked.append(appointment)
+        return booked
+
+    async def offer(self, doctor_id: int, start: datetime, end: datetime) -> Optional[Appointment]:
+        self.offered += 1
+        held = [(hold.start_time, hold.end_time) for hold in slot_holds.overlapping(doctor_id, start, end)]
+        if await has_conflict(doctor_id, start, end, extra=held):
+            return None  # Rebooked or held, up to the doctor's capacity
+        if not await schedule_cache.is_bookable(doctor_id, start, end):
+            return None  # Working hours changed since the slot was booked
+        doctor = await Doctor.get_or_none(id=doctor_id)
+        if doctor is None:
+            return None
+
+        candidates = await WaitlistEntry.filter(
+            Q(doctor_id=doctor_id) | Q(doctor_id__isnull=True, specialization__iexact=doctor.specialization),
+            status="waiting",
+            window_start__lte=start,
+            window_end__gte=end
+        ).order_by("created_at", "id").limit(self.candidates)
+
+        for candidate in candidates:
+            if await Appointment.exists(
+                patient_id=candidate.patient_id,
+                status__in=ACTIVE_STATUSES,
+                start_time__lt=end,
+                end_time__gt=start
+            ):
+                continue
+            try:
+                async with in_transaction() as connection:
+                    entry = await WaitlistEntry.filter(
+                        id=candidate.id, status="waiting"
+                    ).select_for_update(skip_locked=True).using_db(connection).first()
+                    if entry is None:
+                        continue  # Claimed or cancelled meanwhile
+                    appointment = await Appointment.create(
+                        patient_id=entry.patient_id,
+                        doctor_id=doctor_id,
+                        start_time=start,
+                        end_time=end,
+                        status="scheduled",
+                        using_db=connection
+                    )
+                    entry.status = "booked"
+                    entry.appointment_id = appointment.id
+                    await entry.save(using_db=connection, update_fields=["status", "appointment_id"])
+            except IntegrityError as e:
+                if is_overlap_violation(e):
+                    return None  # Someone else rebooked the slot first
+                raise
+            self.booked += 1
+            logger.info(f"Waitlist entry {entry.id} booked into appointment {appointment.id}")
+            return appointment
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "offered": self.offered,
+            "booked": self.booked,
+            "failed": self.failed,
+        }
+
+
+waitlist_matcher = WaitlistMatcher(candidates=MATCH_CANDIDATES)
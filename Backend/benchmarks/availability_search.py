@@ -0,0 +1,112 @@
+"""
+Earliest-availability search across a specialization: 500 doctors by a
+90-day window, with weekday working hours and a few bookings a day each.
+
+Reports end-to-end latency of GET /doctors/availability/search in both
+modes, plus the share spent building the occupancy bitmap.
+"""
+import argparse
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+from time import perf_counter
+from tortoise import Tortoise
+from app.models.doctor import Doctor
+from app.routes.doctor import search_availability, free_slot_grid
+from app.utils.schedule import schedule_cache
+from benchmarks.common import open_database, close_database, report
+
+SPECIALIZATION = "Cardiology"
+WORKING_HOURS = (time(9, tzinfo=timezone.utc), time(17, tzinfo=timezone.utc))
+BOOKINGS_PER_DAY = 4
+
+# (statement, parameter names) run in order
+SEED_STATEMENTS = [
+    ("""
+    INSERT INTO users (username, email, hashed_password, firstname, lastname, role, disabled, token_version)
+    SELECT 'doctor' || i, 'doctor' || i || '@example.com', 'x', 'Bench', 'Doctor' || i, 'Doctor', FALSE, 0
+    FROM generate_series(1, $1) AS i
+    """, ["doctors"]),
+    ("""
+    INSERT INTO doctors (user_id, specialization, contact, experience, fees, capacity)
+    SELECT id, $1, '555-0100', 1, 100, 1 FROM users WHERE role = 'Doctor'
+    """, ["specialization"]),
+    ("""
+    INSERT INTO users (username, email, hashed_password, firstname, lastname, role, disabled, token_version)
+    VALUES ('patient', 'patient@example.com', 'x', 'Bench', 'Patient', 'Patient', FALSE, 0)
+    """, []),
+    ("INSERT INTO patients (phone, user_id) SELECT '555-0199', id FROM users WHERE username = 'patient'", []),
+    ("""
+    INSERT INTO doctor_schedules (doctor_id, weekday, start_time, end_time)
+    SELECT d.id, weekday, $1, $2 FROM doctors AS d, generate_series(0, 4) AS weekday
+    """, ["opens", "closes"]),
+    # Weekday bookings at staggered hours, so every doctor's day looks different
+    ("""
+    INSERT INTO appointments (patient_id, doctor_id, start_time, end_time, status)
+    SELECT p.id, d.id, starts.at, starts.at + INTERVAL '30 minutes', 'scheduled'
+    FROM doctors AS d, patients AS p, generate_series(0, $2 - 1) AS day, generate_series(0, $3 - 1) AS slot,
+         LATERAL (
+             SELECT $1::timestamptz + day * INTERVAL '1 day' + (9 + (d.id + slot * 2) % 8) * INTERVAL '1 hour' AS at
+         ) AS starts
+    WHERE extract(isodow FROM $1::timestamptz + day * INTERVAL '1 day') < 6
+    """, ["window_start", "days", "per_day"]),
+]
+
+
+async def seed(doctors: int, window_start: datetime, days: int):
+    values = {
+        "doctors": doctors,
+        "specialization": SPECIALIZATION,
+        "opens": WORKING_HOURS[0],
+        "closes": WORKING_HOURS[1],
+        "window_start": window_start,
+        "days": days,
+        "per_day": BOOKINGS_PER_DAY,
+    }
+    connection = Tortoise.get_connection("default")
+    for statement, names in SEED_STATEMENTS:
+        await connection.execute_query(statement, [values[name] for name in names])
+    await connection.execute_script("ANALYZE")
+
+
+async def main(doctors: int, days: int, runs: int):
+    await open_database()
+    try:
+        day = datetime.now(timezone.utc).date() + timedelta(days=1)
+        window_start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        window_end = window_start + timedelta(days=days)
+        started = perf_counter()
+        await seed(doctors, window_start, days)
+        bookings = await Tortoise.get_connection("default").execute_query_dict(
+            "SELECT COUNT(*) AS n FROM appointments"
+        )
+        print(f"Seeded {doctors} doctors, {bookings[0]['n']} bookings in {perf_counter() - started:.1f}s")
+
+        rows = await Doctor.filter(specialization=SPECIALIZATION).order_by("id").values_list("id", "capacity")
+        await schedule_cache.load([doctor_id for doctor_id, _ in rows])  # As on a warm worker
+
+        grid_samples, any_samples, all_samples = [], [], []
+        for _ in range(runs):
+            started = perf_counter()
+            await free_slot_grid(rows, window_start, window_end)
+            grid_samples.append(perf_counter() - started)
+            for mode, samples in (("any", any_samples), ("all", all_samples)):
+                started = perf_counter()
+                result = await search_availability(
+                    SPECIALIZATION, window_start, window_end, duration=30, mode=mode, current_user=None
+                )
+                samples.append(perf_counter() - started)
+        print(f"{doctors} doctors x {days} days, {len(result.slots)} slots in the last result")
+        report("bitmap build (free_slot_grid)", grid_samples)
+        report("search mode=any", any_samples)
+        report("search mode=all", all_samples)
+    finally:
+        await close_database()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--doctors", type=int, default=500)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.doctors, args.days, args.runs))
@@ -0,0 +1,123 @@
+"""
+Booking throughput and latency through book_appointment, with the booking
+serializer off (one insert per request, the exclusion constraint deciding
+races) and on (per-doctor queues committing in batches).
+
+Two workloads: bookings spread over many doctors, and a hot doctor whose
+requests mostly compete for the same few slots.
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, time, timedelta, timezone
+from time import perf_counter
+from fastapi import HTTPException
+from tortoise import Tortoise
+from app.models.user import User, UserRole
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.routes.appointment import book_appointment
+from app.schemas.appointment import AppointmentCreate
+from app.utils.booking_serializer import booking_serializer
+from app.utils.interval_index import interval_index
+from benchmarks.common import open_database, close_database, report
+
+SLOT = timedelta(minutes=30)
+
+
+async def seed(doctors: int) -> tuple[list[tuple[Doctor, User]], Patient]:
+    await User.bulk_create([
+        User(
+            username=f"doctor{i}", email=f"doctor{i}@example.com", hashed_password="x",
+            firstname="Bench", lastname=f"Doctor{i}", role=UserRole.DOCTOR
+        )
+        for i in range(doctors)
+    ])
+    users = await User.filter(role=UserRole.DOCTOR).order_by("id")
+    await Doctor.bulk_create([
+        Doctor(user_id=user.id, specialization="Cardiology", contact="555-0100") for user in users
+    ])
+    doctor_rows = await Doctor.all().order_by("id")
+    patient_user = await User.create(
+        username="patient", email="patient@example.com", hashed_password="x",
+        firstname="Bench", lastname="Patient", role=UserRole.PATIENT
+    )
+    patient = await Patient.create(user=patient_user, phone="555-0199")
+    return list(zip(doctor_rows, users)), patient
+
+
+def slot_start(day: int, index: int) -> datetime:
+    first_day = datetime.now(timezone.utc).date() + timedelta(days=1)
+    return datetime.combine(first_day + timedelta(days=day), time(8), tzinfo=timezone.utc) + index * SLOT
+
+
+async def run(
+    patient: Patient, requests: list[tuple[Doctor, User, datetime]], concurrency: int
+) -> tuple[list[float], int, float]:
+    """Book everything with `concurrency` clients; returns (latencies, booked, seconds)"""
+    samples, booked = [], 0
+    pending = iter(requests)
+
+    async def client():
+        nonlocal booked
+        for doctor, user, start in pending:
+            body = AppointmentCreate(
+                patient_id=patient.id,
+                doctor_id=doctor.id,
+                start_time=start.isoformat(),
+                end_time=(start + SLOT).isoformat()
+            )
+            started = perf_counter()
+            try:
+                await book_appointment(body, user)
+                booked += 1
+            except HTTPException as e:
+                if e.status_code != 409:
+                    raise
+            samples.append(perf_counter() - started)
+
+    started = perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return samples, booked, perf_counter() - started
+
+
+async def reset():
+    await Tortoise.get_connection("default").execute_script(
+        "TRUNCATE appointments, appointment_tombstones, doctor_weekly_load CASCADE"
+    )
+    interval_index.clear()
+
+
+async def main(doctors: int, requests: int, concurrency: int, hot_slots: int):
+    await open_database(maxsize=concurrency)
+    try:
+        staff, patient = await seed(doctors)
+        spread = [
+            (*random.choice(staff), slot_start(random.randrange(60), random.randrange(16)))
+            for _ in range(requests)
+        ]
+        hot = [(*staff[0], slot_start(0, random.randrange(hot_slots))) for _ in range(requests)]
+
+        print(f"{requests} bookings per run, {concurrency} concurrent clients")
+        for name, workload in (("spread", spread), ("hot doctor", hot)):
+            for serialized in (False, True):
+                await reset()
+                booking_serializer.enabled = serialized
+                samples, booked, seconds = await run(patient, workload, concurrency)
+                await booking_serializer.stop()
+                label = f"{name}, {'serialized' if serialized else 'direct'}"
+                print(f"{label:<24} {booked} booked, {len(samples) / seconds:7.0f} requests/s")
+                report(label, samples)
+            print(f"  largest batch {booking_serializer.largest_batch}")
+    finally:
+        await close_database()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--hot-slots", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.doctors, args.requests, args.concurrency, args.hot_slots))
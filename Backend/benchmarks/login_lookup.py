@@ -0,0 +1,68 @@
+"""
+Login lookup latency: the old username-then-email lookup (two queries on
+an email login) against find_login_user (one case-insensitive OR query).
+
+bcrypt verification is the same on both paths and is left out, so the
+figures isolate the database round trips. Most frontend logins use the
+email address, which is the old path's slow case.
+"""
+import argparse
+import asyncio
+import random
+from app.models.user import User, UserRole
+from app.utils.auth import find_login_user
+from benchmarks.common import open_database, close_database, timed, report
+
+SEED_BATCH = 1000
+
+
+async def two_query_lookup(login: str):
+    """authenticate_user's lookup before the single-query change"""
+    user = await User.get_or_none(username=login)
+    if not user:
+        user = await User.get_or_none(email=login)
+    return user
+
+
+async def seed(users: int):
+    for first in range(0, users, SEED_BATCH):
+        await User.bulk_create([
+            User(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                hashed_password="x",
+                firstname="Bench",
+                lastname=f"User{i}",
+                role=UserRole.PATIENT
+            )
+            for i in range(first, min(first + SEED_BATCH, users))
+        ])
+    await User.raw("ANALYZE users")
+
+
+async def main(users: int, logins: int):
+    await open_database()
+    try:
+        await seed(users)
+        emails = [f"user{random.randrange(users)}@example.com" for _ in range(logins)]
+        names = [f"user{random.randrange(users)}" for _ in range(logins)]
+        # Warm up connections and plans
+        for login in emails[:50]:
+            await two_query_lookup(login)
+            await find_login_user(login)
+
+        print(f"{users} users, {logins} logins per case")
+        report("email, two queries", [await timed(two_query_lookup, login) for login in emails])
+        report("email, one query", [await timed(find_login_user, login) for login in emails])
+        report("username, two queries", [await timed(two_query_lookup, login) for login in names])
+        report("username, one query", [await timed(find_login_user, login) for login in names])
+    finally:
+        await close_database()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--logins", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.logins))
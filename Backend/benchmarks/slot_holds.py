@@ -0,0 +1,103 @@
+"""
+Slot hold load: the per-request work of POST /appointments/holds with many
+live holds, and hold conversions racing to claim through the database.
+
+The old per-user limit check scanned every live hold; it is timed next to
+the per-owner count that replaced it. The claims run concurrently, as
+several workers converting holds at once would.
+"""
+import argparse
+import asyncio
+import random
+from dataclasses import replace
+from time import perf_counter
+from datetime import datetime, timedelta, timezone
+from app.utils.slot_holds import SlotHoldStore
+from benchmarks.common import open_database, close_database, report
+
+HOLD_LENGTH = timedelta(minutes=30)
+
+
+def scan_held_by(store: SlotHoldStore, owner_id: int) -> int:
+    """SlotHoldStore.held_by before the per-owner count"""
+    return sum(1 for hold in store._holds.values() if hold.owner_id == owner_id)
+
+
+def sync_timed(func, *args) -> float:
+    started = perf_counter()
+    func(*args)
+    return perf_counter() - started
+
+
+def fill(store: SlotHoldStore, holds: int, doctors: int, owners: int) -> list:
+    now = datetime.now(timezone.utc)
+    created = []
+    for _ in range(holds):
+        start = now + timedelta(minutes=15 * random.randrange(4 * 24 * 30))
+        created.append(store.create(random.randrange(doctors), start, start + HOLD_LENGTH, random.randrange(owners)))
+    return created
+
+
+def hold_request(store: SlotHoldStore, doctors: int, owners: int):
+    """The store calls create_slot_hold makes; the capacity check itself hits the interval index"""
+    owner_id, doctor_id = random.randrange(owners), random.randrange(doctors)
+    start = datetime.now(timezone.utc) + timedelta(minutes=15 * random.randrange(4 * 24 * 30))
+    if store.held_by(owner_id) >= store.max_per_user:
+        return
+    hold = store.create(doctor_id, start, start + HOLD_LENGTH, owner_id)
+    store.overlapping(doctor_id, start, start + HOLD_LENGTH, exclude_id=hold.id)
+    store.release(hold)
+
+
+async def claim_round(stores: list[SlotHoldStore], holds: list, concurrency: int) -> list[float]:
+    """Every store claims every hold; returns per-claim latencies"""
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def claim(store, hold_id):
+        async with semaphore:
+            started = perf_counter()
+            await store.claim(hold_id)
+            samples.append(perf_counter() - started)
+
+    await asyncio.gather(*(claim(store, hold.id) for hold in holds for store in stores))
+    return samples
+
+
+async def main(holds: int, doctors: int, owners: int, requests: int, claims: int, workers: int):
+    store = SlotHoldStore(ttl=600, max_per_user=3)
+    fill(store, holds, doctors, owners)
+    print(f"{holds} live holds over {doctors} doctors and {owners} owners")
+    sampled_owners = [random.randrange(owners) for _ in range(requests)]
+    report("held_by, scan", [sync_timed(scan_held_by, store, owner) for owner in sampled_owners])
+    report("held_by, per-owner count", [sync_timed(store.held_by, owner) for owner in sampled_owners])
+    report("hold request (store calls)", [sync_timed(hold_request, store, doctors, owners) for _ in range(requests)])
+
+    await open_database(maxsize=workers * 2)
+    try:
+        # Each store stands in for a worker holding a copy of the same holds
+        stores = [SlotHoldStore(ttl=600, max_per_user=3) for _ in range(workers)]
+        contested = fill(stores[0], claims, doctors, owners)
+        for other in stores[1:]:
+            for hold in contested:
+                other._add(replace(hold))
+        started = perf_counter()
+        samples = await claim_round(stores, contested, workers * 2)
+        elapsed = perf_counter() - started
+        won = sum(1 for store in stores for hold in contested if store._holds[hold.id].converting)
+        print(f"{claims} holds claimed from {workers} workers each: {won} won, {len(samples) / elapsed:.0f} claims/s")
+        report("claim (database)", samples)
+    finally:
+        await close_database()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--holds", type=int, default=50000)
+    parser.add_argument("--doctors", type=int, default=500)
+    parser.add_argument("--owners", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--claims", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.holds, args.doctors, args.owners, args.requests, args.claims, args.workers))
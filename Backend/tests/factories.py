@@ -0,0 +1,49 @@
+"""Builders for test rows and requests"""
+import itertools
+from datetime import datetime, time, timedelta, timezone
+from passlib.hash import bcrypt
+from app.models.user import User, UserRole
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.utils.auth import create_user_access_token
+
+TEST_PASSWORD = "correct horse"
+# Cheap bcrypt rounds; verification works the same for any cost
+TEST_PASSWORD_HASH = bcrypt.using(rounds=4).hash(TEST_PASSWORD)
+
+_sequence = itertools.count(1)
+
+
+async def make_user(role: UserRole = UserRole.PATIENT, **fields) -> User:
+    n = next(_sequence)
+    defaults = {
+        "username": f"user{n}",
+        "email": f"user{n}@example.com",
+        "hashed_password": TEST_PASSWORD_HASH,
+        "firstname": "Test",
+        "lastname": f"User{n}",
+        "role": role,
+    }
+    return await User.create(**{**defaults, **fields})
+
+
+async def make_doctor(capacity: int = 1, specialization: str = "Cardiology") -> Doctor:
+    user = await make_user(UserRole.DOCTOR)
+    return await Doctor.create(
+        user=user, specialization=specialization, contact="555-0100", capacity=capacity
+    )
+
+
+async def make_patient() -> Patient:
+    user = await make_user(UserRole.PATIENT)
+    return await Patient.create(user=user, phone="555-0199")
+
+
+def auth_headers(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_user_access_token(user)}"}
+
+
+def tomorrow_at(hour: int, minute: int = 0) -> datetime:
+    """A UTC datetime on the next day, safely inside every index horizon"""
+    day = datetime.now(timezone.utc).date() + timedelta(days=1)
+    return datetime.combine(day, time(hour, minute), tzinfo=timezone.utc)
@@ -0,0 +1,24 @@
+from app.models.appointment import Appointment
+from tests.factories import make_doctor, make_patient, auth_headers, tomorrow_at
+
+
+async def test_only_the_appointments_doctor_updates_its_status(client):
+    patient = await make_patient()
+    doctor, other = await make_doctor(), await make_doctor()
+    appointment = await Appointment.create(
+        patient=patient, doctor=doctor, start_time=tomorrow_at(10), end_time=tomorrow_at(11)
+    )
+    # Doctor profile IDs and user IDs differ, so only a user_id check passes
+    assert doctor.id != doctor.user_id
+
+    response = await client.patch(
+        f"/appointments/{appointment.id}/status", headers=auth_headers(await other.user), json={"new_status": "completed"}
+    )
+    assert response.status_code == 403
+
+    response = await client.patch(
+        f"/appointments/{appointment.id}/status", headers=auth_headers(await doctor.user), json={"new_status": "completed"}
+    )
+    assert response.status_code == 200
+    await appointment.refresh_from_db()
+    assert appointment.status == "completed"
@@ -0,0 +1,39 @@
+from app.utils.auth import authenticate_user, find_login_user
+from tests.factories import make_user, TEST_PASSWORD
+
+
+async def test_login_by_email_ignores_case(db):
+    user = await make_user(email="Jane.Doe@Example.com")
+    assert (await find_login_user("jane.doe@example.com")).id == user.id
+    assert (await authenticate_user("JANE.DOE@EXAMPLE.COM", TEST_PASSWORD)).id == user.id
+
+
+async def test_username_wins_over_another_accounts_email(db):
+    by_email = await make_user(email="Shared@example.com")
+    by_username = await make_user(username="shared@example.com")
+    # The email match is the older row, so it comes back first
+    assert (await find_login_user("shared@example.com")).id == by_username.id
+    assert (await authenticate_user("SHARED@example.com", TEST_PASSWORD)).id == by_username.id
+    assert by_email.id != by_username.id
+
+
+async def test_wrong_password_or_role_fails(db):
+    user = await make_user(username="alice")
+    assert await authenticate_user("alice", "wrong password") is False
+    assert await authenticate_user("alice", TEST_PASSWORD, role="Admin") is False
+    assert await authenticate_user("nobody", TEST_PASSWORD) is False
+    assert (await authenticate_user("alice", TEST_PASSWORD, role=user.role)).id == user.id
+
+
+async def test_logout_all_revokes_access_and_refresh_tokens(client):
+    user = await make_user(username="alice")
+    login = await client.post("/auth/token", data={"username": "alice", "password": TEST_PASSWORD})
+    assert login.status_code == 200
+    tokens = login.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await client.get(f"/auth/user/getuser/{user.id}", headers=headers)).status_code == 200
+
+    assert (await client.post("/auth/logout-all", headers=headers)).status_code == 204
+    assert (await client.get(f"/auth/user/getuser/{user.id}", headers=headers)).status_code == 401
+    refreshed = await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 401
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import timedelta
+import asyncpg
+from app.models.appointment import Appointment
+from tests.factories import make_doctor, make_patient, auth_headers, tomorrow_at
+
+BOOKINGS = 300
+# Connections for the raw-SQL race; stays under the default max_connections
+RACE_CONNECTIONS = 50
+
+
+def overlapping_interval(i: int):
+    """Distinct intervals that all contain 10:00-10:15 tomorrow"""
+    start = tomorrow_at(9, 45) + timedelta(minutes=i % 15)
+    return start, start + timedelta(minutes=30)
+
+
+async def test_simultaneous_overlapping_bookings_have_one_winner(client):
+    doctor = await make_doctor()
+    patient = await make_patient()
+    headers = auth_headers(await doctor.user)
+
+    async def book(i):
+        start, end = overlapping_interval(i)
+        response = await client.post("/appointments/", headers=headers, json={
+            "patient_id": patient.id,
+            "doctor_id": doctor.id,
+            "start_time": start.isoformat(),
+            "end_time": end.isoformat()
+        })
+        return response.status_code
+
+    statuses = await asyncio.gather(*(book(i) for i in range(BOOKINGS)))
+    assert statuses.count(201) == 1
+    assert statuses.count(409) == BOOKINGS - 1
+    assert await Appointment.filter(doctor_id=doctor.id, status="scheduled").count() == 1
+
+
+async def race_inserts(url: str, doctor_id: int, patient_id: int) -> list[bool]:
+    """
+    Insert BOOKINGS overlapping appointments straight into the database, so
+    no in-process pre-check can help: every transaction is released at once
+    """
+    release = asyncio.Event()
+    pool = await asyncpg.create_pool(url, min_size=RACE_CONNECTIONS, max_size=RACE_CONNECTIONS)
+
+    async def insert(i):
+        start, end = overlapping_interval(i)
+        async with pool.acquire() as connection:
+            await release.wait()
+            try:
+                await connection.execute(
+                    "INSERT INTO appointments (patient_id, doctor_id, start_time, end_time, status) "
+                    "VALUES ($1, $2, $3, $4, 'scheduled')",
+                    patient_id, doctor_id, start, end
+                )
+            except asyncpg.ExclusionViolationError:
+                return False
+            return True
+
+    try:
+        tasks = [asyncio.create_task(insert(i)) for i in range(BOOKINGS)]
+        await asyncio.sleep(0.1)
+        release.set()
+        return await asyncio.gather(*tasks)
+    finally:
+        await pool.close()
+
+
+async def test_exclusion_constraint_decides_racing_inserts(db):
+    doctor = await make_doctor()
+    patient = await make_patient()
+    outcomes = await race_inserts(db, doctor.id, patient.id)
+    assert outcomes.count(True) == 1
+    assert await Appointment.filter(doctor_id=doctor.id, status="scheduled").count() == 1
+
+
+async def test_racing_inserts_fill_every_seat_once(db):
+    # Without the seat trigger's lock every insert saw seat 0 free
+    doctor = await make_doctor(capacity=3)
+    patient = await make_patient()
+    outcomes = await race_inserts(db, doctor.id, patient.id)
+    assert outcomes.count(True) == 3
+    seats = await Appointment.filter(doctor_id=doctor.id, status="scheduled").values_list("seat", flat=True)
+    assert sorted(seats) == [0, 1, 2]
+
+
+async def test_back_to_back_bookings_do_not_conflict(client):
+    doctor = await make_doctor()
+    patient = await make_patient()
+    headers = auth_headers(await doctor.user)
+    for hour in (10, 11):
+        response = await client.post("/appointments/", headers=headers, json={
+            "patient_id": patient.id,
+            "doctor_id": doctor.id,
+            "start_time": tomorrow_at(hour).isoformat(),
+            "end_time": tomorrow_at(hour + 1).isoformat()
+        })
+        assert response.status_code == 201
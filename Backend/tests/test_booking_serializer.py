@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.utils.booking_serializer import BookingSerializer, BookingRequest
+from app.utils.event_broker import event_broker
+from app.utils.slot_holds import slot_holds
+from tests.factories import make_doctor, make_patient, tomorrow_at
+
+
+@pytest.fixture
+async def serializer(db):
+    serializer = BookingSerializer(enabled=True, batch_size=10, idle_timeout=1)
+    yield serializer
+    await serializer.stop()
+
+
+def request(doctor, patient, hour: int, hold=None) -> BookingRequest:
+    return BookingRequest(
+        patient_id=patient.id,
+        doctor_id=doctor.id,
+        start_time=tomorrow_at(hour),
+        end_time=tomorrow_at(hour + 1),
+        status="scheduled",
+        hold_id=hold.id if hold else None
+    )
+
+
+async def test_other_peoples_holds_take_seats_in_a_batch(serializer):
+    doctor = await make_doctor(capacity=2)
+    patient = await make_patient()
+    theirs = slot_holds.create(doctor.id, tomorrow_at(10), tomorrow_at(11), owner_id=1)
+    first = slot_holds.create(doctor.id, tomorrow_at(10), tomorrow_at(11), owner_id=2)
+    try:
+        # One batch: the first converts its own hold, the second finds both seats taken
+        outcomes = await asyncio.gather(
+            serializer.submit(request(doctor, patient, 10, hold=first)),
+            serializer.submit(request(doctor, patient, 10)),
+            return_exceptions=True
+        )
+    finally:
+        slot_holds.release(theirs)
+    assert outcomes[0].doctor_id == doctor.id
+    assert isinstance(outcomes[1], HTTPException) and outcomes[1].status_code == 409
+    assert serializer.largest_batch == 2
+    # The converted hold was completed by the actor
+    assert slot_holds.get(first.id) is None
+
+
+async def test_holds_converted_together_do_not_count_twice(serializer):
+    doctor = await make_doctor(capacity=2)
+    patient = await make_patient()
+    holds = [slot_holds.create(doctor.id, tomorrow_at(10), tomorrow_at(11), owner_id=n) for n in (1, 2)]
+    outcomes = await asyncio.gather(*(serializer.submit(request(doctor, patient, 10, hold=hold)) for hold in holds))
+    assert len(outcomes) == 2
+    assert all(slot_holds.get(hold.id) is None for hold in holds)
+
+
+async def test_actor_announces_its_bookings(serializer):
+    doctor = await make_doctor()
+    patient = await make_patient()
+    subscription = event_broker.subscribe([f"doctor:{doctor.id}"])
+    try:
+        appointment = await serializer.submit(request(doctor, patient, 10))
+        kind, _ = subscription.queue.get_nowait()
+    finally:
+        event_broker.unsubscribe(subscription)
+    assert kind == "appointment.created"
+    assert appointment.id
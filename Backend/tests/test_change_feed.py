@@ -0,0 +1,64 @@
+import asyncpg
+from tests.factories import make_doctor, make_patient, make_user, auth_headers, tomorrow_at
+from app.models.user import UserRole
+from app.models.appointment import Appointment
+
+INSERT_SQL = (
+    "INSERT INTO appointments (patient_id, doctor_id, start_time, end_time, status) "
+    "VALUES ($1, $2, $3, $4, 'scheduled') RETURNING id"
+)
+
+
+async def read_feed(client, headers, since=None) -> tuple[list[int], str]:
+    params = {"since": since} if since else {}
+    response = await client.get("/appointments/changes", headers=headers, params=params)
+    assert response.status_code == 200
+    body = response.json()
+    return [change["id"] for change in body["changes"]], body["next_cursor"]
+
+
+async def test_slow_commit_is_not_skipped(client, db):
+    # Two doctors, since a booking holds its doctor's seat lock until commit
+    doctor, other = await make_doctor(), await make_doctor()
+    patient = await make_patient()
+    headers = auth_headers(await make_user(UserRole.ADMIN))
+    slow = await asyncpg.connect(db)
+    try:
+        # The slow transaction takes its ID and sequence number first...
+        transaction = slow.transaction()
+        await transaction.start()
+        slow_id = await slow.fetchval(INSERT_SQL, patient.id, doctor.id, tomorrow_at(9), tomorrow_at(10))
+        # ...then a later change commits and a client polls
+        fast = await Appointment.create(patient=patient, doctor=other, start_time=tomorrow_at(11), end_time=tomorrow_at(12))
+        seen, cursor = await read_feed(client, headers)
+        assert slow_id not in seen and fast.id not in seen
+
+        await transaction.commit()
+    finally:
+        await slow.close()
+
+    seen, cursor = await read_feed(client, headers, cursor)
+    assert seen == [slow_id, fast.id]
+    seen, _ = await read_feed(client, headers, cursor)
+    assert seen == []
+
+
+async def test_feed_pages_and_reports_deletions(client):
+    doctor = await make_doctor()
+    patient = await make_patient()
+    headers = auth_headers(await doctor.user)
+    appointments = [
+        await Appointment.create(patient=patient, doctor=doctor, start_time=tomorrow_at(hour), end_time=tomorrow_at(hour + 1))
+        for hour in (9, 10, 11)
+    ]
+    response = await client.get("/appointments/changes", headers=headers, params={"limit": 2})
+    body = response.json()
+    assert [change["id"] for change in body["changes"]] == [appointments[0].id, appointments[1].id]
+    assert body["has_more"]
+
+    await appointments[0].delete()
+    seen = await client.get("/appointments/changes", headers=headers, params={"since": body["next_cursor"]})
+    changes = seen.json()["changes"]
+    assert [(change["id"], change["deleted"]) for change in changes] == [
+        (appointments[2].id, False), (appointments[0].id, True)
+    ]
@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+from app.models.appointment import Appointment
+from app.models.medical_record import MedicalRecord
+from tests.factories import make_doctor, make_patient, auth_headers, tomorrow_at
+
+
+@contextmanager
+def recorded_queries():
+    """SQL statements sent through Tortoise while the block runs"""
+    queries = []
+    originals = {name: getattr(AsyncpgDBClient, name) for name in ("execute_query", "execute_query_dict")}
+    for name, original in originals.items():
+        async def recording(self, query, values=None, _original=original):
+            queries.append(query)
+            return await _original(self, query, values)
+        setattr(AsyncpgDBClient, name, recording)
+    try:
+        yield queries
+    finally:
+        for name, original in originals.items():
+            setattr(AsyncpgDBClient, name, original)
+
+
+async def day_view_queries(client, appointments: int) -> list[str]:
+    doctor = await make_doctor()
+    patient = await make_patient()
+    for hour in range(9, 9 + appointments):
+        appointment = await Appointment.create(
+            patient=patient, doctor=doctor, start_time=tomorrow_at(hour), end_time=tomorrow_at(hour, 30)
+        )
+        await MedicalRecord.create(
+            patient=patient, appointment=appointment, doctor=doctor, diagnosis="Checkup", prescription="None"
+        )
+    headers = auth_headers(await doctor.user)
+    params = {"date": tomorrow_at(12).date().isoformat()}
+    # Warm the user cache, so only the view's own queries are counted
+    assert (await client.get("/doctors/me/day", headers=headers, params=params)).status_code == 200
+
+    with recorded_queries() as queries:
+        response = await client.get("/doctors/me/day", headers=headers, params=params)
+    assert response.status_code == 200
+    day = response.json()["appointments"]
+    assert len(day) == appointments
+    assert all(len(item["medical_record_ids"]) == 1 for item in day)
+    return queries
+
+
+async def test_day_view_query_count_does_not_grow_with_appointments(client):
+    # Appointments joined to patients and users, then all their records
+    assert len(await day_view_queries(client, 1)) == 2
+    assert len(await day_view_queries(client, 8)) == 2
@@ -0,0 +1,31 @@
+from app.models.appointment import Appointment
+from tests.factories import make_doctor, make_patient, auth_headers, tomorrow_at
+
+
+def profile(doctor, **changes) -> dict:
+    return {
+        "user_id": doctor.user_id,
+        "specialization": doctor.specialization,
+        "contact": doctor.contact,
+        "experience": doctor.experience,
+        "fees": str(doctor.fees),
+        "capacity": doctor.capacity,
+        **changes
+    }
+
+
+async def test_capacity_cannot_drop_below_seats_in_use(client):
+    doctor = await make_doctor(capacity=3)
+    patient = await make_patient()
+    for _ in range(2):
+        await Appointment.create(patient=patient, doctor=doctor, start_time=tomorrow_at(10), end_time=tomorrow_at(11))
+    headers = auth_headers(await doctor.user)
+
+    response = await client.put(f"/doctors/{doctor.id}", headers=headers, json=profile(doctor, capacity=1))
+    assert response.status_code == 409, response.text
+    await doctor.refresh_from_db()
+    assert doctor.capacity == 3
+
+    response = await client.put(f"/doctors/{doctor.id}", headers=headers, json=profile(doctor, capacity=2))
+    assert response.status_code == 200
+    assert response.json()["capacity"] == 2
@@ -0,0 +1,26 @@
+from passlib.context import CryptContext
+import pytest
+from app.utils.hashing import PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4), workers=2, max_queue=8)
+    yield hasher
+    hasher.shutdown()
+
+
+async def test_wrong_password_is_a_completed_verification(hasher):
+    hashed = await hasher.hash("secret")
+    assert await hasher.verify("secret", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    assert hasher.stats()["completed"] == 3
+    assert hasher.stats()["failed"] == 0
+
+
+async def test_errors_count_as_failed_not_completed(hasher):
+    with pytest.raises(ValueError):
+        await hasher.verify("secret", "not a bcrypt hash")
+    assert hasher.stats()["completed"] == 0
+    assert hasher.stats()["failed"] == 1
+    assert hasher.in_flight == 0
@@ -0,0 +1,61 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from app.models.appointment import Appointment
+from app.models.idempotency_key import IdempotencyKey
+from app.schemas.appointment import AppointmentCreate
+from app.utils.idempotency import ABANDONED_AFTER
+from tests.factories import make_doctor, make_patient, auth_headers, tomorrow_at
+
+
+def booking(doctor, patient, hour: int = 10) -> dict:
+    return {
+        "patient_id": patient.id,
+        "doctor_id": doctor.id,
+        "start_time": tomorrow_at(hour).isoformat(),
+        "end_time": tomorrow_at(hour + 1).isoformat()
+    }
+
+
+async def test_rejection_is_replayed_not_rerun(client):
+    doctor = await make_doctor()
+    patient = await make_patient()
+    headers = auth_headers(await doctor.user)
+    first = await client.post("/appointments/", headers=headers, json=booking(doctor, patient))
+    assert first.status_code == 201
+
+    keyed = {**headers, "Idempotency-Key": "retry-me"}
+    response = await client.post("/appointments/", headers=keyed, json=booking(doctor, patient))
+    assert response.status_code == 409
+    # The slot frees up, but the key already has its answer
+    await Appointment.filter(id=first.json()["id"]).update(status="cancelled")
+    replay = await client.post("/appointments/", headers=keyed, json=booking(doctor, patient))
+    assert replay.status_code == 409
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == response.json()
+    assert await Appointment.filter(doctor_id=doctor.id, status="scheduled").count() == 0
+
+
+async def test_abandoned_request_is_not_run_again(client):
+    doctor = await make_doctor()
+    patient = await make_patient()
+    user = await doctor.user
+    body = booking(doctor, patient)
+    # What a worker that died between booking and storing the response leaves behind
+    payload = AppointmentCreate(**body)
+    await IdempotencyKey.create(
+        user=user,
+        key="orphan",
+        endpoint="appointments.create",
+        request_hash=hashlib.sha256(f"appointments.create:{payload.model_dump_json()}".encode()).hexdigest(),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=1)
+    )
+    await IdempotencyKey.filter(key="orphan").update(
+        created_at=datetime.now(timezone.utc) - ABANDONED_AFTER - timedelta(minutes=1)
+    )
+
+    response = await client.post(
+        "/appointments/", headers={**auth_headers(user), "Idempotency-Key": "orphan"}, json=body
+    )
+    assert response.status_code == 409
+    assert "outcome is unknown" in response.json()["error"]["message"]
+    assert await Appointment.filter(doctor_id=doctor.id).count() == 0
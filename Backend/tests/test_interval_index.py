@@ -0,0 +1,41 @@
+import asyncio
+from app.models.appointment import Appointment
+from app.utils.appointment_events import snapshot
+from app.utils.interval_index import IntervalIndex
+from tests.factories import make_doctor, make_patient, tomorrow_at
+
+
+async def booked_doctor():
+    doctor = await make_doctor()
+    appointment = await Appointment.create(
+        patient=await make_patient(), doctor=doctor, start_time=tomorrow_at(10), end_time=tomorrow_at(11)
+    )
+    return doctor, appointment
+
+
+async def test_load_overlapping_an_invalidation_is_not_kept(db):
+    doctor, _ = await booked_doctor()
+    index = IntervalIndex()
+    load = asyncio.create_task(index.overlapping(doctor.id, tomorrow_at(10), tomorrow_at(11)))
+    await asyncio.sleep(0)  # The load is now waiting on its queries
+    index.invalidate(doctor.id)
+    assert len(await load) == 1
+    assert index.stats()["doctors"] == 0
+    assert index.discarded == 1
+
+    # An undisturbed load is kept
+    await index.overlapping(doctor.id, tomorrow_at(10), tomorrow_at(11))
+    assert index.stats()["doctors"] == 1
+
+
+async def test_cancellation_applied_during_a_load_is_not_lost(db):
+    doctor, appointment = await booked_doctor()
+    index = IntervalIndex()
+    load = asyncio.create_task(index.overlapping(doctor.id, tomorrow_at(10), tomorrow_at(11)))
+    await asyncio.sleep(0)
+    # Committed and applied while the load's reads may still predate it
+    await Appointment.filter(id=appointment.id).update(status="cancelled")
+    index.apply({**snapshot(appointment), "status": "cancelled"})
+    await load
+    assert await index.overlapping(doctor.id, tomorrow_at(10), tomorrow_at(11)) == []
+    assert index.stats()["doctors"] == 1
@@ -0,0 +1,18 @@
+from app.models.user import UserRole
+from tests.factories import make_user, auth_headers
+
+
+async def test_metrics_require_a_token(client):
+    response = await client.get("/metrics")
+    assert response.status_code == 401
+
+
+async def test_metrics_are_admin_only(client):
+    patient = await make_user(UserRole.PATIENT)
+    response = await client.get("/metrics", headers=auth_headers(patient))
+    assert response.status_code == 403
+
+    admin = await make_user(UserRole.ADMIN)
+    response = await client.get("/metrics", headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert "user_cache" in response.json()
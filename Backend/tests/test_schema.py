@@ -0,0 +1,32 @@
+import asyncio
+from tortoise import Tortoise
+from app.utils.database import apply_schema_updates
+from tests.factories import make_doctor, make_patient, tomorrow_at
+from app.models.appointment import Appointment
+
+
+async def test_workers_starting_together_apply_updates_once(db):
+    doctor = await make_doctor()
+    patient = await make_patient()
+    await Appointment.create(
+        patient=patient, doctor=doctor, start_time=tomorrow_at(10), end_time=tomorrow_at(11)
+    )
+
+    await asyncio.gather(*(apply_schema_updates() for _ in range(4)))
+
+    connection = Tortoise.get_connection("default")
+    triggers = await connection.execute_query_dict(
+        "SELECT tgname, COUNT(*) AS n FROM pg_trigger WHERE tgrelid = 'appointments'::regclass "
+        "AND NOT tgisinternal GROUP BY tgname"
+    )
+    assert {row["tgname"]: row["n"] for row in triggers} == {
+        "appointments_assign_seat": 1,
+        "appointments_track_change": 1,
+        "appointments_record_tombstone": 1,
+        "appointments_track_load": 1,
+    }
+    # The load counters were not backfilled a second time
+    load = await connection.execute_query_dict(
+        "SELECT booked_minutes, appointments FROM doctor_weekly_load WHERE doctor_id = $1", [doctor.id]
+    )
+    assert load == [{"booked_minutes": 60, "appointments": 1}]
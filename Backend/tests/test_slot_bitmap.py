@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from app.utils.slot_bitmap import SlotGrid, occupancy, earliest_runs, to_datetime64
+from tests.factories import make_doctor, make_patient, make_user, auth_headers, tomorrow_at
+from app.models.appointment import Appointment
+
+QUARTER = timedelta(minutes=15)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2030, 1, 7, hour, minute, tzinfo=timezone.utc)
+
+
+def test_grid_is_aligned_and_rounds_partial_slots_outwards():
+    grid = SlotGrid(at(9, 5), at(11), QUARTER)
+    assert grid.start == at(9, 15)
+    assert grid.size == 7
+    times = to_datetime64([at(9, 15), at(9, 20), at(9, 30), at(8), at(12)])
+    assert grid.to_slots(times, round_up=False).tolist() == [0, 0, 1, 0, 7]
+    assert grid.to_slots(times, round_up=True).tolist() == [0, 1, 1, 0, 7]
+
+
+def test_occupancy_counts_weighted_overlaps():
+    grid = SlotGrid(at(9), at(10), QUARTER)
+    occupied = occupancy(
+        grid,
+        np.array([0, 0, 1]),
+        to_datetime64([at(9), at(9, 10), at(9, 30)]),
+        to_datetime64([at(9, 30), at(9, 20), at(10)]),
+        n_rows=2,
+        weights=[1, 1, 3]
+    )
+    assert occupied.tolist() == [[2, 2, 0, 0], [0, 0, 3, 3]]
+
+
+def test_earliest_runs():
+    free = np.array([
+        [False, True, True, False, True],
+        [False, True, False, True, False],
+    ])
+    assert earliest_runs(free, 2).tolist() == [1, -1]
+    assert earliest_runs(free, 6).tolist() == [-1, -1]
+
+
+async def test_search_returns_earliest_slot_per_doctor(client):
+    busy, idle = await make_doctor(specialization="Dermatology"), await make_doctor(specialization="Dermatology")
+    await make_doctor(specialization="Cardiology")
+    patient = await make_patient()
+    await Appointment.create(patient=patient, doctor=busy, start_time=tomorrow_at(9), end_time=tomorrow_at(10))
+    user = await make_user()
+
+    response = await client.get("/doctors/availability/search", headers=auth_headers(user), params={
+        "specialization": "dermatology",
+        "from": tomorrow_at(9).isoformat(),
+        "to": tomorrow_at(12).isoformat(),
+        "duration": 30
+    })
+    assert response.status_code == 200
+    slots = [(slot["doctor_id"], slot["start"]) for slot in response.json()["slots"]]
+    assert slots == [
+        (idle.id, tomorrow_at(9).isoformat().replace("+00:00", "Z")),
+        (busy.id, tomorrow_at(10).isoformat().replace("+00:00", "Z")),
+    ]
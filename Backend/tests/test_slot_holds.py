@@ -0,0 +1,80 @@
+import json
+from dataclasses import asdict
+from app.utils.slot_holds import SlotHoldStore, slot_holds
+from tests.factories import make_doctor, make_patient, make_user, auth_headers, tomorrow_at
+
+
+def hold_request(doctor, hour: int) -> dict:
+    return {
+        "doctor_id": doctor.id,
+        "start_time": tomorrow_at(hour).isoformat(),
+        "end_time": tomorrow_at(hour + 1).isoformat()
+    }
+
+
+def booking(doctor, patient, hold_id: str, hour: int = 10) -> dict:
+    return {
+        "patient_id": patient.id,
+        "doctor_id": doctor.id,
+        "start_time": tomorrow_at(hour).isoformat(),
+        "end_time": tomorrow_at(hour + 1).isoformat(),
+        "hold_id": hold_id
+    }
+
+
+def test_per_owner_count_follows_adds_and_removals():
+    store = SlotHoldStore(ttl=60, max_per_user=3)
+    holds = [store.create(1, tomorrow_at(hour), tomorrow_at(hour + 1), owner_id=7) for hour in (9, 10, 11)]
+    store.create(1, tomorrow_at(12), tomorrow_at(13), owner_id=8)
+    assert store.held_by(7) == 3
+    store.release(holds[0])
+    store.release(holds[0])
+    store.complete(holds[1])
+    assert store.held_by(7) == 1
+    assert store.held_by(8) == 1
+    assert store.held_by(9) == 0
+
+
+async def test_hold_in_the_past_is_rejected(client):
+    doctor = await make_doctor()
+    user = await make_user()
+    request = hold_request(doctor, 10)
+    request["start_time"] = tomorrow_at(10).replace(year=2020).isoformat()
+    response = await client.post("/appointments/holds", headers=auth_headers(user), json=request)
+    assert response.status_code == 400
+
+
+async def test_doctor_converts_the_patients_hold_but_not_a_strangers(client):
+    doctor = await make_doctor()
+    patient, stranger = await make_patient(), await make_patient()
+    doctor_headers = auth_headers(await doctor.user)
+
+    response = await client.post("/appointments/holds", headers=auth_headers(await stranger.user), json=hold_request(doctor, 10))
+    assert response.status_code == 201
+    response = await client.post(
+        "/appointments/", headers=doctor_headers, json=booking(doctor, patient, response.json()["hold_id"])
+    )
+    assert response.status_code == 403
+
+    response = await client.post("/appointments/holds", headers=auth_headers(await patient.user), json=hold_request(doctor, 11))
+    assert response.status_code == 201
+    response = await client.post(
+        "/appointments/", headers=doctor_headers, json=booking(doctor, patient, response.json()["hold_id"], hour=11)
+    )
+    assert response.status_code == 201
+
+
+async def test_hold_is_claimed_on_one_worker_only(db):
+    doctor = await make_doctor()
+    hold = slot_holds.create(doctor.id, tomorrow_at(10), tomorrow_at(11), owner_id=1)
+    # Another worker's copy, as replicated by publish_hold_created
+    other_worker = SlotHoldStore(ttl=60, max_per_user=3)
+    other_worker.apply_remote(json.loads(json.dumps({"action": "create", "hold": asdict(hold)}, default=str)))
+    try:
+        assert await slot_holds.claim(hold.id) is hold
+        assert await other_worker.claim(hold.id) is None
+
+        await slot_holds.abandon(hold)
+        assert await other_worker.claim(hold.id) is not None
+    finally:
+        slot_holds.release(hold)
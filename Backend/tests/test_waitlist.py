@@ -0,0 +1,77 @@
+from app.models.appointment import Appointment
+from app.models.waitlist import WaitlistEntry
+from app.utils.appointment_events import wait_for_backfills
+from app.utils.event_broker import event_broker
+from app.utils.waitlist import waitlist_matcher
+from tests.factories import make_doctor, make_patient, auth_headers, tomorrow_at
+
+
+async def cancel(client, doctor, appointment):
+    return await client.patch(
+        f"/appointments/{appointment.id}/status",
+        headers=auth_headers(await doctor.user),
+        json={"new_status": "cancelled"}
+    )
+
+
+async def booked_with_waiting_patient(doctor):
+    booked, waiting = await make_patient(), await make_patient()
+    appointment = await Appointment.create(
+        patient=booked, doctor=doctor, start_time=tomorrow_at(10), end_time=tomorrow_at(11)
+    )
+    entry = await WaitlistEntry.create(
+        patient=waiting, doctor=doctor, window_start=tomorrow_at(9), window_end=tomorrow_at(12)
+    )
+    return appointment, entry
+
+
+async def test_cancelled_slot_goes_to_the_waitlist(client):
+    doctor = await make_doctor()
+    appointment, entry = await booked_with_waiting_patient(doctor)
+
+    assert (await cancel(client, doctor, appointment)).status_code == 200
+    await wait_for_backfills()
+    await entry.refresh_from_db()
+    assert entry.status == "booked"
+    rebooked = await Appointment.get(id=entry.appointment_id)
+    assert (rebooked.patient_id, rebooked.status) == (entry.patient_id, "scheduled")
+
+
+async def test_failed_backfill_does_not_fail_the_cancel(client, monkeypatch):
+    doctor = await make_doctor()
+    appointment, entry = await booked_with_waiting_patient(doctor)
+    subscription = event_broker.subscribe([f"doctor:{doctor.id}"])
+
+    async def broken_offer(*args):
+        raise RuntimeError("waitlist unavailable")
+    monkeypatch.setattr(waitlist_matcher, "offer", broken_offer)
+    failed = waitlist_matcher.failed
+    try:
+        assert (await cancel(client, doctor, appointment)).status_code == 200
+        # The cancellation was pushed before the backfill ran
+        kind, _ = subscription.queue.get_nowait()
+        assert kind == "appointment.cancelled"
+        await wait_for_backfills()
+    finally:
+        event_broker.unsubscribe(subscription)
+    assert waitlist_matcher.failed == failed + 1
+    await entry.refresh_from_db()
+    assert entry.status == "waiting"
+
+
+async def test_specialization_entries_match_in_any_case(client):
+    doctor = await make_doctor(specialization="Cardiology")
+    booked, waiting = await make_patient(), await make_patient()
+    appointment = await Appointment.create(
+        patient=booked, doctor=doctor, start_time=tomorrow_at(10), end_time=tomorrow_at(11)
+    )
+    entry = await WaitlistEntry.create(
+        patient=waiting, specialization="cardiology", window_start=tomorrow_at(9), window_end=tomorrow_at(12)
+    )
+
+    assert (await cancel(client, doctor, appointment)).status_code == 200
+    await wait_for_backfills()
+    await entry.refresh_from_db()
+    assert entry.status == "booked"
+    rebooked = await Appointment.get(id=entry.appointment_id)
+    assert rebooked.doctor_id == doctor.id